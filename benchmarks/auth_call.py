@@ -0,0 +1,49 @@
+"""
+Cost of adding authentication to a request once the token is cached (OAuth2ClientCredentials.__call__),
+alone and combined with static authentication (also measured alone for Basic).
+
+Usage: python benchmarks/auth_call.py [--calls 200000]
+"""
+
+import argparse
+import timeit
+
+import requests
+
+import requests_auth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token", client_id="test_user", client_secret="test_pwd"
+    )
+    requests_auth.OAuth2.token_cache.add_access_token(auth.state, "a" * 1000, 3600)
+    request = requests.Request("GET", "http://authorized_only").prepare()
+
+    composite_auths = {
+        "OAuth2ClientCredentials": auth,
+        "Basic": requests_auth.Basic("user", "password"),
+        "HeaderApiKey + HeaderApiKey + OAuth2ClientCredentials": requests_auth.HeaderApiKey(
+            "key1", "X-Key1"
+        )
+        + requests_auth.HeaderApiKey("key2", "X-Key2")
+        + auth,
+        "HeaderApiKey + Basic + OAuth2ClientCredentials": requests_auth.HeaderApiKey(
+            "key1", "X-Key1"
+        )
+        + requests_auth.Basic("user", "password")
+        + auth,
+    }
+    for name, composite_auth in composite_auths.items():
+        best = min(
+            timeit.repeat(lambda: composite_auth(request), number=args.calls, repeat=5)
+        )
+        print(f"{name}: {best / args.calls * 1e9:.0f}ns per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Cost of adding an API key to the query string of URLs with many query parameters (QueryApiKey.__call__).
+
+Usage: python benchmarks/query_api_key.py [--parameters 0 20 200] [--calls 2000]
+"""
+
+import argparse
+import timeit
+
+import requests
+
+import requests_auth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--parameters", type=int, nargs="+", default=[0, 20, 200])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    for parameters in args.parameters:
+        query = "&".join(f"field{i}=value%20{i}" for i in range(parameters))
+        request = requests.Request(
+            "GET", f"http://authorized_only/ingest?{query}"
+        ).prepare()
+        url = request.url
+        for fast_append in (False, True):
+            auth = requests_auth.QueryApiKey("my_api_key", fast_append=fast_append)
+
+            def call():
+                request.url = url
+                auth(request)
+
+            best = min(timeit.repeat(call, number=args.calls, repeat=5))
+            print(
+                f"{parameters} query parameters, fast_append={fast_append}: "
+                f"{best / args.calls * 1e6:.1f}us per call"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Cold-start thundering herd on the OAuth2 token cache.
+
+Many threads call OAuth2ClientCredentials.__call__ at the same time on an empty cache,
+spread over several distinct client credentials (distinct cache keys).
+The token endpoint is simulated with a fixed latency (no network involved).
+
+Usage: python benchmarks/token_cache_contention.py [--keys 40] [--threads 400] [--latency 0.05]
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+import requests
+
+import requests_auth
+import requests_auth.authentication
+from requests_auth.oauth2_tokens import TokenMemoryCache
+
+
+def simulate_token_endpoint(latency: float):
+    def request_new_grant_with_post(url, data, grant_name, timeout, auth, **kwargs):
+        time.sleep(latency)
+        return f"token for {auth[0]}", 3600, None
+
+    requests_auth.authentication.request_new_grant_with_post = (
+        request_new_grant_with_post
+    )
+
+
+def thundering_herd(keys: int, threads: int) -> list:
+    requests_auth.OAuth2.token_cache = TokenMemoryCache()
+    auths = [
+        requests_auth.OAuth2ClientCredentials(
+            "http://provide_access_token", client_id=f"client{i}", client_secret="pwd"
+        )
+        for i in range(keys)
+    ]
+    start = threading.Barrier(threads)
+    latencies = [0.0] * threads
+    errors = []
+
+    def call(index: int):
+        request = requests.Request("GET", "http://authorized_only").prepare()
+        start.wait()
+        before = time.perf_counter()
+        try:
+            auths[index % keys](request)
+        except Exception as e:
+            errors.append(e)
+            return
+        latencies[index] = time.perf_counter() - before
+
+    workers = [threading.Thread(target=call, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # Latencies of failed calls would be meaningless
+    if errors:
+        raise Exception(
+            f"{len(errors)} of {threads} calls failed, first error: {errors[0]!r}"
+        ) from errors[0]
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=40)
+    parser.add_argument("--threads", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    simulate_token_endpoint(args.latency)
+    latencies = sorted(thundering_herd(args.keys, args.threads))
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{args.threads} threads, {args.keys} keys, {args.latency * 1000:.0f}ms token endpoint: "
+        f"p50={p50 * 1000:.1f}ms p99={p99 * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Cost of token cache operations logging debug messages while debug logging is disabled.
+
+Measures adding a token (TokenMemoryCache.add_access_token) and retrieving a missing token
+(TokenMemoryCache.get_token requesting a new token, simulated without network).
+
+Usage: python benchmarks/token_cache_logging.py [--calls 20000]
+"""
+
+import argparse
+import logging
+import timeit
+
+from requests_auth.oauth2_tokens import TokenMemoryCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    token_cache = TokenMemoryCache()
+
+    best = min(
+        timeit.repeat(
+            lambda: token_cache.add_access_token("key1", "token1", 3600),
+            number=args.calls,
+            repeat=5,
+        )
+    )
+    print(
+        f"TokenMemoryCache.add_access_token: {best / args.calls * 1e9:.0f}ns per call"
+    )
+
+    def get_missing_token():
+        token_cache.tokens = {}
+        token_cache.get_token("key1", lambda: ("key1", "token1", 3600))
+
+    best = min(timeit.repeat(get_missing_token, number=args.calls, repeat=5))
+    print(
+        f"TokenMemoryCache.get_token (missing token): {best / args.calls * 1e9:.0f}ns per call"
+    )
+
+
+if __name__ == "__main__":
+    main()
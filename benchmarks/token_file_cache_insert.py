@@ -0,0 +1,47 @@
+"""
+Token insert throughput of file token caches, depending on the number of tokens already cached.
+
+JsonTokenFileCache rewrites every token on each insert while JournalTokenFileCache appends a line.
+
+Usage: python benchmarks/token_file_cache_insert.py [--sizes 10 1000 10000] [--inserts 200]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from requests_auth.oauth2_tokens import JsonTokenFileCache, JournalTokenFileCache
+
+
+def inserts_per_second(cache_class, size: int, inserts: int) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        token_cache = cache_class(os.path.join(directory, "tokens.cache"))
+        # Fill the cache with a single write
+        token_cache.tokens = {
+            f"key{i}": (f"token{i}", time.time() + 3600) for i in range(size)
+        }
+        token_cache._save_tokens()
+
+        before = time.perf_counter()
+        for i in range(inserts):
+            token_cache.add_access_token(f"key{i % size}", f"new_token{i}", 3600)
+        return inserts / (time.perf_counter() - before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--inserts", type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        for cache_class in (JsonTokenFileCache, JournalTokenFileCache):
+            print(
+                f"{cache_class.__name__} with {size} tokens: "
+                f"{inserts_per_second(cache_class, size, args.inserts):.0f} inserts/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -17,8 +17,19 @@ from requests_auth.authentication import (
     OAuth2ClientCredentials,
     OktaClientCredentials,
     OAuth2ResourceOwnerPasswordCredentials,
+    create_token_session,
+    RetryPolicy,
+    CircuitBreaker,
+    warm_up,
+)
+from requests_auth.oauth2_tokens import (
+    TokenMemoryCache,
+    JsonTokenFileCache,
+    MultiprocessJsonTokenFileCache,
+    JournalTokenFileCache,
+    SqliteTokenCache,
+    SharedMemoryTokenCache,
 )
-from requests_auth.oauth2_tokens import JsonTokenFileCache
 from requests_auth.errors import (
     GrantNotProvided,
     TimeoutOccurred,
@@ -27,5 +38,6 @@ from requests_auth.errors import (
     InvalidToken,
     TokenExpiryNotProvided,
     InvalidGrantRequest,
+    CircuitBreakerOpen,
 )
 from requests_auth.version import __version__
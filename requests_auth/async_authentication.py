@@ -0,0 +1,287 @@
+"""
+Authentication classes for asynchronous HTTP clients.
+
+Every class can be provided as auth parameter to httpx (httpx.AsyncClient or httpx.Client)
+or as a client middleware to aiohttp (aiohttp.ClientSession(middlewares=[auth.aiohttp_middleware])).
+
+Tokens are shared with synchronous authentication classes (stored in OAuth2.token_cache) and requested using httpx.
+"""
+
+import abc
+import asyncio
+import functools
+import weakref
+
+import httpx
+
+from requests_auth.authentication import (
+    _INVALID_TOKEN_CHALLENGE,
+    OAuth2,
+    OAuth2ClientCredentials,
+    OAuth2ResourceOwnerPasswordCredentials,
+    HeaderApiKey,
+    QueryApiKey,
+    Basic,
+)
+from requests_auth.errors import (
+    InvalidGrantRequest,
+    GrantNotProvided,
+    AuthenticationFailed,
+)
+
+# Locks per event loop and token key, ensuring a single token request per key at a time
+_missing_token_locks = weakref.WeakKeyDictionary()
+
+
+async def async_request_new_grant_with_post(
+    url: str, data, grant_name: str, timeout: float, auth=None, client=None
+) -> (str, int, str):
+    """
+    Unlike request_new_grant_with_post, the request is not retried (retry_policy), guarded by a circuit breaker
+    or reported to instrumentation.
+
+    :param client: httpx.AsyncClient used to send the request. A new client (without connection pooling between
+    requests) is used by default.
+    :return: A tuple (token, expires_in, refresh_token), expires_in and refresh_token being None if not provided.
+    """
+    if client:
+        response = await client.post(url, data=data, timeout=timeout, auth=auth)
+    else:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(url, data=data, timeout=timeout, auth=auth)
+    if not response.is_success:
+        # As described in https://tools.ietf.org/html/rfc6749#section-5.2
+        raise InvalidGrantRequest(response)
+
+    content = response.json()
+    token = content.get(grant_name)
+    if not token:
+        raise GrantNotProvided(grant_name, content)
+    return token, content.get("expires_in"), content.get("refresh_token")
+
+
+async def _get_token(oauth2_auth) -> str:
+    """
+    Return the token from OAuth2.token_cache, requesting a new one if needed (once per key at a time).
+
+    :param oauth2_auth: Authentication providing state, async_request_new_token and request_new_token.
+    """
+    # Only a valid token already in memory is checked within the event loop (no lock nor I/O)
+    token = OAuth2.token_cache._get_cached_token(oauth2_auth.state)
+    if token:
+        return token
+
+    loop = asyncio.get_running_loop()
+    locks = _missing_token_locks.setdefault(loop, {})
+    async with locks.setdefault(oauth2_auth.state, asyncio.Lock()):
+        # Token might have been received while waiting for the lock
+        token = OAuth2.token_cache._get_cached_token(oauth2_auth.state)
+        if token:
+            return token
+
+        try:
+            # Token cache might load tokens (file, database, broker) or wait for threading locks
+            return await loop.run_in_executor(
+                None, OAuth2.token_cache.get_token, oauth2_auth.state
+            )
+        except AuthenticationFailed:
+            pass
+
+        received_tokens = [await oauth2_auth.async_request_new_token()]
+
+        def request_new_token():
+            # Provide the token received asynchronously, following requests will be performed in background
+            return (
+                received_tokens.pop()
+                if received_tokens
+                else oauth2_auth.request_new_token()
+            )
+
+        # Token cache might wait for threading (or file) locks, held while other threads request this token
+        return await loop.run_in_executor(
+            None,
+            functools.partial(
+                OAuth2.token_cache.get_token,
+                oauth2_auth.state,
+                request_new_token,
+                background_refresh=True,
+            ),
+        )
+
+
+class _AsyncAuth(httpx.Auth, abc.ABC):
+    """Authentication adding static values to requests, the same way for httpx and aiohttp."""
+
+    @abc.abstractmethod
+    async def authenticate(self, request):
+        """
+        Add authentication to the request.
+
+        :param request: httpx or aiohttp request.
+        """
+
+    async def async_auth_flow(self, request: httpx.Request):
+        await self.authenticate(request)
+        yield request
+
+    async def aiohttp_middleware(self, request, handler):
+        """aiohttp client middleware."""
+        await self.authenticate(request)
+        return await handler(request)
+
+
+class _AsyncOAuth2Auth(httpx.Auth):
+    def _is_rejected(self, status_code: int, headers) -> bool:
+        return (
+            self.retry_on_invalid_token
+            and status_code == 401
+            and bool(
+                _INVALID_TOKEN_CHALLENGE.search(headers.get("WWW-Authenticate", ""))
+            )
+        )
+
+    def _set_header(self, request, token: str):
+        request.headers[self.header_name] = self._header_value(token)
+
+    def auth_flow(self, request: httpx.Request):
+        token = OAuth2.token_cache.get_token(
+            self.state, self.request_new_token, background_refresh=True
+        )
+        self._set_header(request, token)
+        response = yield request
+        if self._is_rejected(response.status_code, response.headers):
+            OAuth2.token_cache.invalidate_token(self.state, token)
+            self._set_header(
+                request,
+                OAuth2.token_cache.get_token(
+                    self.state, self.request_new_token, background_refresh=True
+                ),
+            )
+            yield request
+
+    async def async_auth_flow(self, request: httpx.Request):
+        token = await _get_token(self)
+        self._set_header(request, token)
+        response = yield request
+        if self._is_rejected(response.status_code, response.headers):
+            OAuth2.token_cache.invalidate_token(self.state, token)
+            self._set_header(request, await _get_token(self))
+            yield request
+
+    async def aiohttp_middleware(self, request, handler):
+        """aiohttp client middleware."""
+        token = await _get_token(self)
+        self._set_header(request, token)
+        response = await handler(request)
+        if self._is_rejected(response.status, response.headers):
+            OAuth2.token_cache.invalidate_token(self.state, token)
+            response.release()
+            self._set_header(request, await _get_token(self))
+            response = await handler(request)
+        return response
+
+
+class AsyncOAuth2ResourceOwnerPasswordCredentials(
+    OAuth2ResourceOwnerPasswordCredentials, _AsyncOAuth2Auth
+):
+    """
+    Resource Owner Password Credentials Grant
+
+    Describes an OAuth 2 resource owner password credentials (also called password) flow asynchronous authentication.
+    More details can be found in https://tools.ietf.org/html/rfc6749#section-4.3
+    """
+
+    def __init__(self, token_url: str, username: str, password: str, **kwargs):
+        """
+        :param client: httpx.AsyncClient used to request tokens. A new client is used for every token request by default.
+        :param kwargs: OAuth2ResourceOwnerPasswordCredentials parameters.
+        """
+        self.client = kwargs.pop("client", None)
+        OAuth2ResourceOwnerPasswordCredentials.__init__(
+            self, token_url, username, password, **kwargs
+        )
+
+    async def async_request_new_token(self) -> tuple:
+        # As described in https://tools.ietf.org/html/rfc6749#section-4.3.3
+        token, expires_in, _ = await async_request_new_grant_with_post(
+            self.token_url,
+            self.data,
+            self.token_field_name,
+            self.timeout,
+            auth=(self.username, self.password),
+            client=self.client,
+        )
+        # Handle both Access and Bearer tokens
+        return (self.state, token, expires_in) if expires_in else (self.state, token)
+
+
+class AsyncOAuth2ClientCredentials(OAuth2ClientCredentials, _AsyncOAuth2Auth):
+    """
+    Client Credentials Grant
+
+    Describes an OAuth 2 client credentials (also called application) flow asynchronous authentication.
+    More details can be found in https://tools.ietf.org/html/rfc6749#section-4.4
+    """
+
+    def __init__(self, token_url: str, client_id: str, client_secret: str, **kwargs):
+        """
+        :param client: httpx.AsyncClient used to request tokens. A new client is used for every token request by default.
+        :param kwargs: OAuth2ClientCredentials parameters.
+        """
+        self.client = kwargs.pop("client", None)
+        OAuth2ClientCredentials.__init__(
+            self, token_url, client_id, client_secret, **kwargs
+        )
+
+    async def async_request_new_token(self) -> tuple:
+        # As described in https://tools.ietf.org/html/rfc6749#section-4.4.3
+        token, expires_in, _ = await async_request_new_grant_with_post(
+            self.token_url,
+            self.data,
+            self.token_field_name,
+            self.timeout,
+            auth=(self.client_id, self.client_secret),
+            client=self.client,
+        )
+        # Handle both Access and Bearer tokens
+        return (self.state, token, expires_in) if expires_in else (self.state, token)
+
+
+class AsyncHeaderApiKey(HeaderApiKey, _AsyncAuth):
+    """Describes an API Key asynchronous authentication."""
+
+    def auth_flow(self, request: httpx.Request):
+        yield HeaderApiKey.__call__(self, request)
+
+    async def authenticate(self, request):
+        request.headers[self.header_name] = self.api_key
+
+
+class AsyncQueryApiKey(QueryApiKey, _AsyncAuth):
+    """Describes an API Key asynchronous authentication."""
+
+    def auth_flow(self, request: httpx.Request):
+        request.url = request.url.copy_set_param(
+            self.query_parameter_name, self.api_key
+        )
+        yield request
+
+    async def authenticate(self, request):
+        if isinstance(request, httpx.Request):
+            request.url = request.url.copy_set_param(
+                self.query_parameter_name, self.api_key
+            )
+        else:  # aiohttp
+            request.url = request.url.update_query(
+                {self.query_parameter_name: self.api_key}
+            )
+
+
+class AsyncBasic(Basic, _AsyncAuth):
+    """Describes a basic asynchronous authentication."""
+
+    def auth_flow(self, request: httpx.Request):
+        yield Basic.__call__(self, request)
+
+    async def authenticate(self, request):
+        request.headers["Authorization"] = self._authorization()
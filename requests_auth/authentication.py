@@ -1,16 +1,38 @@
 import base64
+import email.utils
+import functools
+import concurrent.futures
+import http.cookiejar
+import logging
 import os
+import random
+import re
+import threading
+import time
 import uuid
 from hashlib import sha256, sha512
 from urllib.parse import parse_qs, urlsplit, urlunsplit, urlencode
 from typing import Optional
 
 import requests
+import requests.adapters
 import requests.auth
+import requests.cookies
+import requests.hooks
 import warnings
 
-from requests_auth import oauth2_authentication_responses_server, oauth2_tokens
-from requests_auth.errors import InvalidGrantRequest, GrantNotProvided
+from requests_auth import (
+    instrumentation,
+    oauth2_authentication_responses_server,
+    oauth2_tokens,
+)
+from requests_auth.errors import (
+    InvalidGrantRequest,
+    GrantNotProvided,
+    CircuitBreakerOpen,
+)
+
+logger = logging.getLogger(__name__)
 
 
 def _add_parameters(initial_url: str, extra_parameters: dict) -> str:
@@ -59,10 +81,303 @@ def _get_query_parameter(url: str, param_name: str) -> Optional[str]:
     return all_values[0] if all_values else None
 
 
+def create_token_session(
+    pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = False
+) -> requests.Session:
+    """
+    Create a session to be used to request tokens.
+    Connections are kept alive and reused across token requests. Cookies are not stored.
+
+    :param pool_connections: Number of hosts (token endpoints) to keep connections for.
+    :param pool_maxsize: Maximum number of connections kept per host.
+    :param pool_block: Wait for a connection to be available instead of opening a new (not kept) connection
+    when pool_maxsize connections are already in use for a host.
+    :return: The session.
+    """
+    session = requests.Session()
+    # Session is shared by all authentication, tokens endpoints must not share cookies
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RetryPolicy:
+    """
+    Retry token requests failing with a temporary error (connection error, timeout or retry_statuses response),
+    waiting for an exponential backoff with full jitter (or the delay requested by the server) between attempts.
+
+    Retries are limited by a budget shared by every token request using this policy, so that a burst of failures
+    does not multiply the load on the token endpoint.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff: float = 0.5,
+        max_delay: float = 30,
+        retry_statuses: tuple = (429, 500, 502, 503, 504),
+        budget_ratio: float = 0.1,
+        max_budget: float = 10,
+    ):
+        """
+        :param max_attempts: Maximum number of attempts (including the first one) per token request.
+        :param backoff: Maximum number of seconds to wait before the first retry, doubled for every following retry.
+        The actual delay is randomly chosen between 0 and this maximum.
+        :param max_delay: Maximum number of seconds to wait between two attempts. The request is not retried if the
+        server requests (via Retry-After header) to wait longer.
+        :param retry_statuses: Response status codes that should be retried.
+        :param budget_ratio: Number of retries (usually a fraction) added to the budget by each token request.
+        :param max_budget: Maximum (and initial) number of retries in the budget.
+        """
+        if max_attempts < 1:
+            raise Exception("max_attempts must be a positive integer.")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+        self.budget_ratio = budget_ratio
+        self.max_budget = max_budget
+        self.budget = max_budget
+        self.budget_lock = threading.Lock()
+        # Number of retries performed
+        self.retries = 0
+        # Number of retries that were not performed as the budget was exhausted
+        self.denied_retries = 0
+
+    def send(self, send_request) -> requests.Response:
+        """
+        Send a request, retrying it if needed.
+
+        :param send_request: Function sending the request and returning the response.
+        :return: The last response received.
+        :raise requests.ConnectionError: or requests.Timeout if the last attempt failed this way.
+        """
+        with self.budget_lock:
+            self.budget = min(self.max_budget, self.budget + self.budget_ratio)
+        attempt = 1
+        while True:
+            try:
+                response, error = send_request(), None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, error = None, e
+            if response is not None and response.status_code not in self.retry_statuses:
+                return response
+
+            delay = self._delay(attempt, response)
+            if attempt >= self.max_attempts or delay is None or not self._withdraw():
+                if error:
+                    raise error
+                return response
+            logger.debug("Retrying token request in %.3f seconds.", delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _delay(self, attempt: int, response: Optional[requests.Response]):
+        """
+        :return: Number of seconds to wait before the next attempt, None if the server requests to wait too long.
+        """
+        retry_after = (
+            response.headers.get("Retry-After") if response is not None else None
+        )
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:  # HTTP date
+                try:
+                    delay = (
+                        email.utils.parsedate_to_datetime(retry_after).timestamp()
+                        - time.time()
+                    )
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return max(delay, 0) if delay <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.backoff * 2 ** (attempt - 1)))
+
+    def _withdraw(self) -> bool:
+        """Consume a retry from the budget, return False if the budget is exhausted."""
+        with self.budget_lock:
+            if self.budget < 1:
+                self.denied_retries += 1
+                return False
+            self.budget -= 1
+            self.retries += 1
+            return True
+
+
+class _Circuit:
+    def __init__(self):
+        self.state = CircuitBreaker.CLOSED
+        self.consecutive_failures = 0
+        # time.monotonic value when circuit was opened
+        self.opened_at = 0.0
+
+
+class CircuitBreaker:
+    """
+    Stop requesting tokens to a token endpoint after consecutive failures (connection error, timeout or
+    failure_statuses response), for a cool down period.
+
+    Once cool down period is over, a single request is sent to the token endpoint (half-open circuit):
+    requests are allowed again if it succeeds, stopped for another cool down period otherwise.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        cool_down: float = 30,
+        failure_statuses: tuple = (429, 500, 502, 503, 504),
+    ):
+        """
+        :param failure_threshold: Number of consecutive failures after which token endpoint is not requested anymore.
+        :param cool_down: Number of seconds during which token endpoint is not requested.
+        :param failure_statuses: Response status codes considered as token endpoint failures.
+        """
+        if failure_threshold < 1:
+            raise Exception("failure_threshold must be a positive integer.")
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self.failure_statuses = failure_statuses
+        # Token URL to _Circuit
+        self.circuits = {}
+        self.lock = threading.Lock()
+        # Number of token requests that were not sent as circuit was open
+        self.rejected_requests = 0
+
+    def state(self, url: str) -> str:
+        """
+        :param url: Token endpoint URL.
+        :return: CLOSED (token endpoint is requested), OPEN (token endpoint is not requested)
+        or HALF_OPEN (a single request is being sent to the token endpoint).
+        """
+        circuit = self.circuits.get(url)
+        return circuit.state if circuit else self.CLOSED
+
+    @property
+    def states(self) -> dict:
+        """Token endpoint URL to circuit state, for every token endpoint requested so far."""
+        return {url: circuit.state for url, circuit in list(self.circuits.items())}
+
+    def send(self, url: str, send_request) -> requests.Response:
+        """
+        Send a request to a token endpoint unless circuit is open.
+
+        :param url: Token endpoint URL.
+        :param send_request: Function sending the request and returning the response.
+        :return: The response.
+        :raise CircuitBreakerOpen: If token endpoint is not requested.
+        """
+        with self.lock:
+            circuit = self.circuits.setdefault(url, _Circuit())
+            if circuit.state == self.OPEN:
+                if time.monotonic() - circuit.opened_at < self.cool_down:
+                    self.rejected_requests += 1
+                    raise CircuitBreakerOpen(url)
+                circuit.state = self.HALF_OPEN
+            elif circuit.state == self.HALF_OPEN:
+                # Another request is probing the token endpoint
+                self.rejected_requests += 1
+                raise CircuitBreakerOpen(url)
+
+        try:
+            response = send_request()
+        except:
+            self._record(circuit, success=False)
+            raise
+        self._record(circuit, success=response.status_code not in self.failure_statuses)
+        return response
+
+    def _record(self, circuit: _Circuit, success: bool):
+        with self.lock:
+            if success:
+                circuit.state = self.CLOSED
+                circuit.consecutive_failures = 0
+                return
+            circuit.consecutive_failures += 1
+            if (
+                circuit.state == self.HALF_OPEN
+                or circuit.consecutive_failures >= self.failure_threshold
+            ):
+                if circuit.state != self.OPEN:
+                    logger.warning(
+                        "Token endpoint will not be requested for %s seconds after %d consecutive failures.",
+                        self.cool_down,
+                        circuit.consecutive_failures,
+                    )
+                circuit.state = self.OPEN
+                circuit.opened_at = time.monotonic()
+
+
 def request_new_grant_with_post(
-    url: str, data, grant_name: str, timeout: float, auth=None
-) -> (str, int):
-    response = requests.post(url, data=data, timeout=timeout, auth=auth)
+    url: str,
+    data,
+    grant_name: str,
+    timeout: float,
+    auth=None,
+    session=None,
+    retry_policy: RetryPolicy = None,
+    circuit_breaker: CircuitBreaker = None,
+) -> (str, int, str):
+    """
+    :param session: requests.Session used to send the request. OAuth2.session by default.
+    :param retry_policy: RetryPolicy used to retry the request. OAuth2.retry_policy by default.
+    :param circuit_breaker: CircuitBreaker used to stop requesting a failing token endpoint.
+    OAuth2.circuit_breaker by default.
+    :return: A tuple (token, expires_in, refresh_token), expires_in and refresh_token being None if not provided.
+    :raise CircuitBreakerOpen: If token endpoint is not requested after too many consecutive failures.
+    """
+    args = (
+        url,
+        data,
+        grant_name,
+        timeout,
+        auth,
+        session,
+        retry_policy,
+        circuit_breaker,
+    )
+    if instrumentation.enabled:
+        return instrumentation.timed(
+            "token_request", url, _request_new_grant_with_post, *args
+        )
+    return _request_new_grant_with_post(*args)
+
+
+def _request_new_grant_with_post(
+    url: str,
+    data,
+    grant_name: str,
+    timeout: float,
+    auth,
+    session,
+    retry_policy: RetryPolicy,
+    circuit_breaker: CircuitBreaker,
+) -> (str, int, str):
+    session = session or OAuth2.session
+    retry_policy = retry_policy or OAuth2.retry_policy
+    circuit_breaker = circuit_breaker or OAuth2.circuit_breaker
+
+    def send_request() -> requests.Response:
+        if retry_policy:
+            return retry_policy.send(
+                lambda: session.post(url, data=data, timeout=timeout, auth=auth)
+            )
+        return session.post(url, data=data, timeout=timeout, auth=auth)
+
+    if circuit_breaker:
+        response = circuit_breaker.send(url, send_request)
+    else:
+        response = send_request()
     if not response:
         # As described in https://tools.ietf.org/html/rfc6749#section-5.2
         raise InvalidGrantRequest(response)
@@ -71,11 +386,54 @@ def request_new_grant_with_post(
     token = content.get(grant_name)
     if not token:
         raise GrantNotProvided(grant_name, content)
-    return token, content.get("expires_in")
+    return token, content.get("expires_in"), content.get("refresh_token")
+
+
+def _request_token_with_refresh_token(
+    oauth2_auth, refresh_token: str, auth=None
+) -> tuple:
+    """
+    Request a new token using a refresh token as described in https://tools.ietf.org/html/rfc6749#section-6
+
+    :param oauth2_auth: Authentication providing state, token_url, refresh_data, token_field_name, timeout and session.
+    :param refresh_token: Refresh token previously received alongside the token.
+    :param auth: Client authentication (if any).
+    :return: A tuple (state, token, expires_in, refresh_token).
+    """
+    token, expires_in, new_refresh_token = request_new_grant_with_post(
+        oauth2_auth.token_url,
+        {**oauth2_auth.refresh_data, "refresh_token": refresh_token},
+        oauth2_auth.token_field_name,
+        oauth2_auth.timeout,
+        auth=auth,
+        session=oauth2_auth.session,
+    )
+    # Authorization server might not issue a new refresh token (keeping the previous one valid)
+    return oauth2_auth.state, token, expires_in, new_refresh_token or refresh_token
 
 
 class OAuth2:
     token_cache = oauth2_tokens.TokenMemoryCache()
+    # Session used to request tokens (unless provided to the authentication)
+    session = create_token_session()
+    # RetryPolicy used to retry failed token requests (not retried by default)
+    retry_policy = None
+    # CircuitBreaker used to stop requesting failing token endpoints (always requested by default)
+    circuit_breaker = None
+
+
+def _instrumented(call):
+    """Report the duration of an authentication to the active instrumentation (if enabled)."""
+
+    @functools.wraps(call)
+    def instrumented_call(self, r):
+        if instrumentation.enabled:
+            return instrumentation.timed(
+                "authentication", type(self).__name__, call, self, r
+            )
+        return call(self, r)
+
+    return instrumented_call
 
 
 class SupportMultiAuth:
@@ -124,7 +482,91 @@ class BrowserAuth:
         )
 
 
-class OAuth2ResourceOwnerPasswordCredentials(requests.auth.AuthBase, SupportMultiAuth):
+# As described in https://tools.ietf.org/html/rfc6750#section-3.1
+_INVALID_TOKEN_CHALLENGE = re.compile(
+    r'\bbearer\b.*\berror\s*=\s*"?invalid_token\b', re.IGNORECASE
+)
+
+
+class TokenHeader:
+    """Format the token using header_value, once per token."""
+
+    # Latest (token, header value), replaced at once so that it can be read without lock
+    _formatted_token = None, None
+
+    def _header_value(self, token: str) -> str:
+        formatted_token = self._formatted_token
+        # Token is the same object for as long as it is cached
+        if formatted_token[0] is not token:
+            formatted_token = token, self.header_value.format(token=token)
+            self._formatted_token = formatted_token
+        return formatted_token[1]
+
+
+class InvalidTokenRetry:
+    def __init__(self, kwargs):
+        """
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
+        """
+        self.retry_on_invalid_token = bool(kwargs.pop("retry_on_invalid_token", None))
+
+    def _set_token(self, r, token: str):
+        r.headers[self.header_name] = self._header_value(token)
+        if self.retry_on_invalid_token:
+            try:
+                # File-like body must be sent again from the same position
+                body_position = r.body.tell()
+            except (AttributeError, OSError):
+                body_position = None
+            r.register_hook(
+                "response",
+                lambda response, **kwargs: self._handle_401(
+                    response, token, body_position, **kwargs
+                ),
+            )
+
+    def _handle_401(self, r, token: str, body_position: Optional[int], **kwargs):
+        if r.status_code != 401 or not _INVALID_TOKEN_CHALLENGE.search(
+            r.headers.get("WWW-Authenticate", "")
+        ):
+            return r
+
+        # Other threads rejected with the same token will not remove the new one
+        OAuth2.token_cache.invalidate_token(self.state, token)
+
+        body = r.request.body
+        if body_position is not None:
+            body.seek(body_position)
+        elif body is not None and not isinstance(body, (str, bytes)):
+            logger.debug(
+                "Token was rejected by the server, request body cannot be sent again."
+            )
+            return r
+        logger.debug(
+            "Token was rejected by the server, sending request with a new one."
+        )
+
+        # Consume content and release the original connection to allow our new request to reuse the same one.
+        r.content
+        r.close()
+        prep = r.request.copy()
+        requests.cookies.extract_cookies_to_jar(prep._cookies, r.request, r.raw)
+        prep.prepare_cookies(prep._cookies)
+        # New request is sent by the connection: response hooks will not be called (request is sent only once)
+        prep.hooks = requests.hooks.default_hooks()
+        self(prep)
+
+        _r = r.connection.send(prep, **kwargs)
+        _r.history.append(r)
+        _r.request = prep
+        return _r
+
+
+class OAuth2ResourceOwnerPasswordCredentials(
+    requests.auth.AuthBase, SupportMultiAuth, TokenHeader, InvalidTokenRetry
+):
     """
     Resource Owner Password Credentials Grant
 
@@ -144,8 +586,12 @@ class OAuth2ResourceOwnerPasswordCredentials(requests.auth.AuthBase, SupportMult
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param scope: Scope parameter sent to token URL as body. Can also be a list of scopes. Not sent by default.
         :param token_field_name: Field name containing the token. access_token by default.
+        :param session: requests.Session used to request tokens. Shared OAuth2.session by default.
         :param kwargs: all additional authorization parameters that should be put as body parameters in the token URL.
         """
         self.token_url = token_url
@@ -160,6 +606,7 @@ class OAuth2ResourceOwnerPasswordCredentials(requests.auth.AuthBase, SupportMult
         self.kwargs = kwargs
 
         extra_parameters = dict(kwargs)
+        InvalidTokenRetry.__init__(self, extra_parameters)
         self.header_name = extra_parameters.pop("header_name", None) or "Authorization"
         self.header_value = (
             extra_parameters.pop("header_value", None) or "Bearer {token}"
@@ -173,6 +620,7 @@ class OAuth2ResourceOwnerPasswordCredentials(requests.auth.AuthBase, SupportMult
 
         # Time is expressed in seconds
         self.timeout = int(extra_parameters.pop("timeout", None) or 60)
+        self.session = extra_parameters.pop("session", None)
 
         # As described in https://tools.ietf.org/html/rfc6749#section-4.3.2
         self.data = {
@@ -188,25 +636,31 @@ class OAuth2ResourceOwnerPasswordCredentials(requests.auth.AuthBase, SupportMult
         all_parameters_in_url = _add_parameters(self.token_url, self.data)
         self.state = sha512(all_parameters_in_url.encode("unicode_escape")).hexdigest()
 
+    @_instrumented
     def __call__(self, r):
-        token = OAuth2.token_cache.get_token(self.state, self.request_new_token)
-        r.headers[self.header_name] = self.header_value.format(token=token)
+        token = OAuth2.token_cache.get_token(
+            self.state, self.request_new_token, background_refresh=True
+        )
+        self._set_token(r, token)
         return r
 
     def request_new_token(self):
         # As described in https://tools.ietf.org/html/rfc6749#section-4.3.3
-        token, expires_in = request_new_grant_with_post(
+        token, expires_in, _ = request_new_grant_with_post(
             self.token_url,
             self.data,
             self.token_field_name,
             self.timeout,
             auth=(self.username, self.password),
+            session=self.session,
         )
         # Handle both Access and Bearer tokens
         return (self.state, token, expires_in) if expires_in else (self.state, token)
 
 
-class OAuth2ClientCredentials(requests.auth.AuthBase, SupportMultiAuth):
+class OAuth2ClientCredentials(
+    requests.auth.AuthBase, SupportMultiAuth, TokenHeader, InvalidTokenRetry
+):
     """
     Client Credentials Grant
 
@@ -226,8 +680,12 @@ class OAuth2ClientCredentials(requests.auth.AuthBase, SupportMultiAuth):
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param scope: Scope parameter sent to token URL as body. Can also be a list of scopes. Not sent by default.
         :param token_field_name: Field name containing the token. access_token by default.
+        :param session: requests.Session used to request tokens. Shared OAuth2.session by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter in the token URL.
         """
         self.token_url = token_url
@@ -242,6 +700,7 @@ class OAuth2ClientCredentials(requests.auth.AuthBase, SupportMultiAuth):
         self.kwargs = kwargs
 
         extra_parameters = dict(kwargs)
+        InvalidTokenRetry.__init__(self, extra_parameters)
         self.header_name = extra_parameters.pop("header_name", None) or "Authorization"
         self.header_value = (
             extra_parameters.pop("header_value", None) or "Bearer {token}"
@@ -255,6 +714,7 @@ class OAuth2ClientCredentials(requests.auth.AuthBase, SupportMultiAuth):
 
         # Time is expressed in seconds
         self.timeout = int(extra_parameters.pop("timeout", None) or 60)
+        self.session = extra_parameters.pop("session", None)
 
         # As described in https://tools.ietf.org/html/rfc6749#section-4.4.2
         self.data = {"grant_type": "client_credentials"}
@@ -266,25 +726,35 @@ class OAuth2ClientCredentials(requests.auth.AuthBase, SupportMultiAuth):
         all_parameters_in_url = _add_parameters(self.token_url, self.data)
         self.state = sha512(all_parameters_in_url.encode("unicode_escape")).hexdigest()
 
+    @_instrumented
     def __call__(self, r):
-        token = OAuth2.token_cache.get_token(self.state, self.request_new_token)
-        r.headers[self.header_name] = self.header_value.format(token=token)
+        token = OAuth2.token_cache.get_token(
+            self.state, self.request_new_token, background_refresh=True
+        )
+        self._set_token(r, token)
         return r
 
     def request_new_token(self) -> tuple:
         # As described in https://tools.ietf.org/html/rfc6749#section-4.4.3
-        token, expires_in = request_new_grant_with_post(
+        token, expires_in, _ = request_new_grant_with_post(
             self.token_url,
             self.data,
             self.token_field_name,
             self.timeout,
             auth=(self.client_id, self.client_secret),
+            session=self.session,
         )
         # Handle both Access and Bearer tokens
         return (self.state, token, expires_in) if expires_in else (self.state, token)
 
 
-class OAuth2AuthorizationCode(requests.auth.AuthBase, SupportMultiAuth, BrowserAuth):
+class OAuth2AuthorizationCode(
+    requests.auth.AuthBase,
+    SupportMultiAuth,
+    BrowserAuth,
+    TokenHeader,
+    InvalidTokenRetry,
+):
     """
     Authorization Code Grant
 
@@ -317,9 +787,13 @@ class OAuth2AuthorizationCode(requests.auth.AuthBase, SupportMultiAuth, BrowserA
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param response_type: Value of the response_type query parameter if not already provided in authorization URL.
         code by default.
         :param token_field_name: Field name containing the token. access_token by default.
+        :param session: requests.Session used to request tokens. Shared OAuth2.session by default.
         :param code_field_name: Field name containing the code. code by default.
         :param username: User name in case basic authentication should be used to retrieve token.
         :param password: User password in case basic authentication should be used to retrieve token.
@@ -339,6 +813,7 @@ class OAuth2AuthorizationCode(requests.auth.AuthBase, SupportMultiAuth, BrowserA
             raise Exception("Token URL is mandatory.")
 
         BrowserAuth.__init__(self, kwargs)
+        InvalidTokenRetry.__init__(self, kwargs)
 
         self.header_name = kwargs.pop("header_name", None) or "Authorization"
         self.header_value = kwargs.pop("header_value", None) or "Bearer {token}"
@@ -346,6 +821,7 @@ class OAuth2AuthorizationCode(requests.auth.AuthBase, SupportMultiAuth, BrowserA
             raise Exception("header_value parameter must contains {token}.")
 
         self.token_field_name = kwargs.pop("token_field_name", None) or "access_token"
+        self.session = kwargs.pop("session", None)
 
         username = kwargs.pop("username", None)
         password = kwargs.pop("password", None)
@@ -394,12 +870,28 @@ class OAuth2AuthorizationCode(requests.auth.AuthBase, SupportMultiAuth, BrowserA
         }
         self.token_data.update(kwargs)
 
+        # As described in https://tools.ietf.org/html/rfc6749#section-6
+        self.refresh_data = {"grant_type": "refresh_token"}
+        self.refresh_data.update(kwargs)
+
+    @_instrumented
     def __call__(self, r):
         token = OAuth2.token_cache.get_token(self.state, self.request_new_token)
-        r.headers[self.header_name] = self.header_value.format(token=token)
+        self._set_token(r, token)
         return r
 
     def request_new_token(self):
+        # Refresh token is kept until rejected by the server (request might fail for other reasons)
+        refresh_token = OAuth2.token_cache.get_refresh_token(self.state)
+        if refresh_token:
+            try:
+                return _request_token_with_refresh_token(
+                    self, refresh_token, auth=self.auth
+                )
+            except (InvalidGrantRequest, GrantNotProvided) as e:
+                logger.warning(f"Unable to refresh token, requesting a new one: {e}")
+                OAuth2.token_cache.pop_refresh_token(self.state)
+
         # Request code
         state, code = oauth2_authentication_responses_server.request_new_grant(
             self.code_grant_details
@@ -408,19 +900,24 @@ class OAuth2AuthorizationCode(requests.auth.AuthBase, SupportMultiAuth, BrowserA
         # As described in https://tools.ietf.org/html/rfc6749#section-4.1.3
         self.token_data["code"] = code
         # As described in https://tools.ietf.org/html/rfc6749#section-4.1.4
-        token, expires_in = request_new_grant_with_post(
+        token, expires_in, refresh_token = request_new_grant_with_post(
             self.token_url,
             self.token_data,
             self.token_field_name,
             self.timeout,
             auth=self.auth,
+            session=self.session,
         )
         # Handle both Access and Bearer tokens
-        return (self.state, token, expires_in) if expires_in else (self.state, token)
+        return self.state, token, expires_in, refresh_token
 
 
 class OAuth2AuthorizationCodePKCE(
-    requests.auth.AuthBase, SupportMultiAuth, BrowserAuth
+    requests.auth.AuthBase,
+    SupportMultiAuth,
+    BrowserAuth,
+    TokenHeader,
+    InvalidTokenRetry,
 ):
     """
     Proof Key for Code Exchange
@@ -454,9 +951,13 @@ class OAuth2AuthorizationCodePKCE(
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param response_type: Value of the response_type query parameter if not already provided in authorization URL.
         code by default.
         :param token_field_name: Field name containing the token. access_token by default.
+        :param session: requests.Session used to request tokens. Shared OAuth2.session by default.
         :param code_field_name: Field name containing the code. code by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter
         in the authorization URL and as body parameters in the token URL.
@@ -474,6 +975,7 @@ class OAuth2AuthorizationCodePKCE(
             raise Exception("Token URL is mandatory.")
 
         BrowserAuth.__init__(self, kwargs)
+        InvalidTokenRetry.__init__(self, kwargs)
 
         self.header_name = kwargs.pop("header_name", None) or "Authorization"
         self.header_value = kwargs.pop("header_value", None) or "Bearer {token}"
@@ -481,6 +983,7 @@ class OAuth2AuthorizationCodePKCE(
             raise Exception("header_value parameter must contains {token}.")
 
         self.token_field_name = kwargs.pop("token_field_name", None) or "access_token"
+        self.session = kwargs.pop("session", None)
 
         # As described in https://tools.ietf.org/html/rfc6749#section-4.1.2
         code_field_name = kwargs.pop("code_field_name", "code")
@@ -539,12 +1042,26 @@ class OAuth2AuthorizationCodePKCE(
         }
         self.token_data.update(kwargs)
 
+        # As described in https://tools.ietf.org/html/rfc6749#section-6
+        self.refresh_data = {"grant_type": "refresh_token"}
+        self.refresh_data.update(kwargs)
+
+    @_instrumented
     def __call__(self, r):
         token = OAuth2.token_cache.get_token(self.state, self.request_new_token)
-        r.headers[self.header_name] = self.header_value.format(token=token)
+        self._set_token(r, token)
         return r
 
     def request_new_token(self) -> tuple:
+        # Refresh token is kept until rejected by the server (request might fail for other reasons)
+        refresh_token = OAuth2.token_cache.get_refresh_token(self.state)
+        if refresh_token:
+            try:
+                return _request_token_with_refresh_token(self, refresh_token)
+            except (InvalidGrantRequest, GrantNotProvided) as e:
+                logger.warning(f"Unable to refresh token, requesting a new one: {e}")
+                OAuth2.token_cache.pop_refresh_token(self.state)
+
         # Request code
         state, code = oauth2_authentication_responses_server.request_new_grant(
             self.code_grant_details
@@ -553,11 +1070,15 @@ class OAuth2AuthorizationCodePKCE(
         # As described in https://tools.ietf.org/html/rfc6749#section-4.1.3
         self.token_data["code"] = code
         # As described in https://tools.ietf.org/html/rfc6749#section-4.1.4
-        token, expires_in = request_new_grant_with_post(
-            self.token_url, self.token_data, self.token_field_name, self.timeout
+        token, expires_in, refresh_token = request_new_grant_with_post(
+            self.token_url,
+            self.token_data,
+            self.token_field_name,
+            self.timeout,
+            session=self.session,
         )
         # Handle both Access and Bearer tokens
-        return (self.state, token, expires_in) if expires_in else (self.state, token)
+        return self.state, token, expires_in, refresh_token
 
     @staticmethod
     def generate_code_verifier() -> bytes:
@@ -592,7 +1113,13 @@ class OAuth2AuthorizationCodePKCE(
         return base64.urlsafe_b64encode(digest).rstrip(b"=")
 
 
-class OAuth2Implicit(requests.auth.AuthBase, SupportMultiAuth, BrowserAuth):
+class OAuth2Implicit(
+    requests.auth.AuthBase,
+    SupportMultiAuth,
+    BrowserAuth,
+    TokenHeader,
+    InvalidTokenRetry,
+):
     """
     Implicit Grant
 
@@ -628,6 +1155,9 @@ class OAuth2Implicit(requests.auth.AuthBase, SupportMultiAuth, BrowserAuth):
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter
         in the authorization URL.
         Usual parameters are:
@@ -640,6 +1170,7 @@ class OAuth2Implicit(requests.auth.AuthBase, SupportMultiAuth, BrowserAuth):
             raise Exception("Authorization URL is mandatory.")
 
         BrowserAuth.__init__(self, kwargs)
+        InvalidTokenRetry.__init__(self, kwargs)
 
         self.header_name = kwargs.pop("header_name", None) or "Authorization"
         self.header_value = kwargs.pop("header_value", None) or "Bearer {token}"
@@ -683,13 +1214,14 @@ class OAuth2Implicit(requests.auth.AuthBase, SupportMultiAuth, BrowserAuth):
             self.redirect_uri_port,
         )
 
+    @_instrumented
     def __call__(self, r):
         token = OAuth2.token_cache.get_token(
             self.state,
             oauth2_authentication_responses_server.request_new_grant,
             self.grant_details,
         )
-        r.headers[self.header_name] = self.header_value.format(token=token)
+        self._set_token(r, token)
         return r
 
 
@@ -726,6 +1258,9 @@ class AzureActiveDirectoryImplicit(OAuth2Implicit):
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter
         in the authorization URL.
         Usual parameters are:
@@ -773,6 +1308,9 @@ class AzureActiveDirectoryImplicitIdToken(OAuth2Implicit):
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter
         in the authorization URL.
         Usual parameters are:
@@ -827,6 +1365,9 @@ class OktaImplicit(OAuth2Implicit):
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter
         in the authorization URL.
         Usual parameters are:
@@ -880,6 +1421,9 @@ class OktaImplicitIdToken(OAuth2Implicit):
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter
         in the authorization URL.
         Usual parameters are:
@@ -912,6 +1456,7 @@ class OktaAuthorizationCode(OAuth2AuthorizationCode):
         token by default.
         :param token_field_name: Name of the expected field containing the token.
         access_token by default.
+        :param session: requests.Session used to request tokens. Shared OAuth2.session by default.
         :param nonce: Refer to http://openid.net/specs/openid-connect-core-1_0.html#IDToken for more details
         (formatted as an Universal Unique Identifier - UUID). Use a newly generated UUID by default.
         :param authorization_server: OKTA authorization server
@@ -935,6 +1480,9 @@ class OktaAuthorizationCode(OAuth2AuthorizationCode):
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter
         in the authorization URL.
         Usual parameters are:
@@ -965,6 +1513,7 @@ class OktaAuthorizationCodePKCE(OAuth2AuthorizationCodePKCE):
         code by default.
         :param token_field_name: Name of the expected field containing the token.
         access_token by default.
+        :param session: requests.Session used to request tokens. Shared OAuth2.session by default.
         :param code_field_name: Field name containing the code. code by default.
         :param nonce: Refer to http://openid.net/specs/openid-connect-core-1_0.html#IDToken for more details
         (formatted as an Universal Unique Identifier - UUID). Use a newly generated UUID by default.
@@ -989,6 +1538,9 @@ class OktaAuthorizationCodePKCE(OAuth2AuthorizationCodePKCE):
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter
         in the authorization URL and as body parameters in the token URL.
         Usual parameters are:
@@ -1026,9 +1578,13 @@ class OktaClientCredentials(OAuth2ClientCredentials):
         :param header_value: Format used to send the token value.
         "{token}" must be present as it will be replaced by the actual token.
         Token will be sent as "Bearer {token}" by default.
+        :param retry_on_invalid_token: In case the token is rejected by the server (401 response with a Bearer
+        WWW-Authenticate challenge containing invalid_token error), remove it from cache, request a new token
+        and send the request again (only once). Disabled by default.
         :param scope: Scope parameter sent to token URL as body. Can also be a list of scopes.
         Request 'openid' by default.
         :param token_field_name: Field name containing the token. access_token by default.
+        :param session: requests.Session used to request tokens. Shared OAuth2.session by default.
         :param kwargs: all additional authorization parameters that should be put as query parameter in the token URL.
         """
         authorization_server = kwargs.pop("authorization_server", None) or "default"
@@ -1064,27 +1620,88 @@ class HeaderApiKey(requests.auth.AuthBase, SupportMultiAuth):
 class QueryApiKey(requests.auth.AuthBase, SupportMultiAuth):
     """Describes an API Key requests authentication."""
 
-    def __init__(self, api_key: str, query_parameter_name: str = None):
+    def __init__(
+        self, api_key: str, query_parameter_name: str = None, fast_append: bool = False
+    ):
         """
         :param api_key: The API key that will be sent.
         :param query_parameter_name: Name of the query parameter. "api_key" by default.
+        :param fast_append: Append the (already encoded) API key to the URL, leaving other query parameters as is.
+        Query parameters are parsed and encoded again on every request by default.
         """
         self.api_key = api_key
         if not api_key:
             raise Exception("API Key is mandatory.")
         self.query_parameter_name = query_parameter_name or "api_key"
+        self.fast_append = fast_append
+        # Encoded once as it does not change
+        self.encoded_parameter = urlencode({self.query_parameter_name: self.api_key})
+        self.encoded_parameter_prefix = urlencode({self.query_parameter_name: ""})
 
     def __call__(self, r):
-        r.url = _add_parameters(r.url, {self.query_parameter_name: self.api_key})
+        if self.fast_append:
+            r.url = self._append_parameter(r.url)
+        else:
+            r.url = _add_parameters(r.url, {self.query_parameter_name: self.api_key})
         return r
 
+    def _append_parameter(self, url: str) -> str:
+        url, hash_sign, fragment = url.partition("#")
+        url, question_mark, query_string = url.partition("?")
+        if not query_string:
+            return f"{url}?{self.encoded_parameter}{hash_sign}{fragment}"
+
+        if f"&{query_string}".find(f"&{self.encoded_parameter_prefix}") != -1:
+            # Parameter is already provided, replace it (only in this case the query string is split)
+            query_string = "&".join(
+                parameter
+                for parameter in query_string.split("&")
+                if not parameter.startswith(self.encoded_parameter_prefix)
+            )
+        separator = "&" if query_string else ""
+        return f"{url}?{query_string}{separator}{self.encoded_parameter}{hash_sign}{fragment}"
+
+
+def _basic_authorization(username, password) -> str:
+    """
+    Return the Authorization header value of a basic authentication, as described in
+    https://tools.ietf.org/html/rfc7617
+
+    :param username: User name (str or bytes). str is encoded as latin1.
+    :param password: Password (str or bytes). str is encoded as latin1.
+    """
+    if isinstance(username, str):
+        username = username.encode("latin1")
+    if isinstance(password, str):
+        password = password.encode("latin1")
+    return "Basic " + base64.b64encode(b":".join((username, password))).decode("ascii")
+
 
 class Basic(requests.auth.HTTPBasicAuth, SupportMultiAuth):
     """Describes a basic requests authentication."""
 
+    # Authorization header value, computed again once username or password is changed
+    _authorization_value = None
+
     def __init__(self, username: str, password: str):
         requests.auth.HTTPBasicAuth.__init__(self, username, password)
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in ("username", "password"):
+            self._authorization_value = None
+
+    def _authorization(self) -> str:
+        authorization = self._authorization_value
+        if authorization is None:
+            authorization = _basic_authorization(self.username, self.password)
+            self._authorization_value = authorization
+        return authorization
+
+    def __call__(self, r):
+        r.headers["Authorization"] = self._authorization()
+        return r
+
 
 class NTLM(requests.auth.AuthBase, SupportMultiAuth):
     """Describes a NTLM requests authentication."""
@@ -1134,7 +1751,7 @@ class _MultiAuth(requests.auth.AuthBase):
 
     def __call__(self, r):
         for authentication_mode in self.authentication_modes:
-            authentication_mode.__call__(r)
+            authentication_mode(r)
         return r
 
     def __add__(self, other):
@@ -1155,3 +1772,46 @@ class Auths(_MultiAuth):
             DeprecationWarning,
         )
         super().__init__(*authentication_modes)
+
+
+def warm_up(*auths, max_workers: int = None) -> list:
+    """
+    Request missing tokens concurrently (at process startup for instance), so that first requests do not wait for them.
+    Tokens are stored in OAuth2.token_cache.
+
+    :param auths: Authentications to request tokens for. Only client credentials and resource owner password
+    credentials authentications (including within combined authentications) are considered, others are ignored.
+    :param max_workers: Maximum number of tokens requested at the same time. All tokens are requested at once by default.
+    :return: A (authentication, duration in seconds, exception or None if token was retrieved) tuple per
+    considered authentication. Failures are not raised.
+    """
+    to_warm_up = []
+    for auth in auths:
+        for authentication_mode in (
+            auth.authentication_modes if isinstance(auth, _MultiAuth) else (auth,)
+        ):
+            if isinstance(
+                authentication_mode,
+                (OAuth2ClientCredentials, OAuth2ResourceOwnerPasswordCredentials),
+            ):
+                to_warm_up.append(authentication_mode)
+    if not to_warm_up:
+        return []
+
+    def get_token(auth) -> tuple:
+        start = time.perf_counter()
+        try:
+            OAuth2.token_cache.get_token(
+                auth.state, auth.request_new_token, background_refresh=True
+            )
+            error = None
+        except Exception as e:
+            logger.warning("Unable to warm up token for %s: %s", auth.token_url, e)
+            error = e
+        return auth, time.perf_counter() - start, error
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers or len(to_warm_up),
+        thread_name_prefix="requests_auth warm up",
+    ) as executor:
+        return list(executor.map(get_token, to_warm_up))
@@ -0,0 +1,247 @@
+"""
+Token broker: a local process requesting (and refreshing) tokens on behalf of other processes of the same host.
+
+Processes use BrokerTokenCache as OAuth2.token_cache to retrieve tokens from the broker over a Unix domain socket.
+
+Every message starts with a fixed size header followed by the key and the token (UTF-8 encoded):
+ * Request: operation (GET, PUT, DELETE), expiry (PUT), key length, token length (PUT, DELETE)
+ * Response: status (OK, NOT_FOUND, FAILED), expiry, token length (token being the error message if FAILED)
+"""
+
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import List, Optional
+
+from requests_auth import oauth2_tokens
+from requests_auth.errors import AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+GET, PUT, DELETE = 1, 2, 3
+OK, NOT_FOUND, FAILED = 0, 1, 2
+
+# operation, expiry, key length, token length
+_request_header = struct.Struct("<BdII")
+# status, expiry, token length
+_response_header = struct.Struct("<BdI")
+
+
+def _receive(connection: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed.")
+        data += chunk
+    return data
+
+
+class _BrokerRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # Connections are kept open by clients, handle requests until connection is closed
+        while True:
+            try:
+                header = _receive(self.request, _request_header.size)
+            except ConnectionError:
+                return
+            operation, expiry, key_length, token_length = _request_header.unpack(header)
+            key = _receive(self.request, key_length).decode()
+            token = _receive(self.request, token_length).decode()
+            status, expiry, token = self.server.broker.handle(
+                operation, key, expiry, token
+            )
+            token = token.encode()
+            self.request.sendall(
+                _response_header.pack(status, expiry, len(token)) + token
+            )
+
+
+class _BrokerServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class TokenBroker:
+    """
+    Request tokens for the provided authentication and send them to BrokerTokenCache clients.
+    Tokens are requested once per key at a time and in background before expiry.
+    Tokens received by clients (for other authentication) are also shared with every client.
+    """
+
+    def __init__(self, socket_path: str, *auths, early_refresh_ratio: float = 0.1):
+        """
+        :param socket_path: Location of the Unix domain socket. Only accessible by the current user.
+        :param auths: OAuth2 authentication (requesting tokens without user interaction) handled by the broker.
+        :param early_refresh_ratio: Ratio of token lifetime left when a new token should be requested in background.
+        For instance 0.1 (default) to request a new token when only 10% of its lifetime is left.
+        """
+        self.socket_path = socket_path
+        self.auths = {auth.state: auth for auth in auths}
+        self.token_cache = oauth2_tokens.TokenMemoryCache(
+            early_refresh_ratio=early_refresh_ratio
+        )
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except FileNotFoundError:
+            pass
+        except ConnectionRefusedError:
+            # Previous broker did not stop properly
+            os.remove(socket_path)
+        else:
+            raise Exception(f"A broker is already listening on {socket_path}.")
+        finally:
+            probe.close()
+        self.server = _BrokerServer(
+            socket_path, _BrokerRequestHandler, bind_and_activate=False
+        )
+        try:
+            self.server.server_bind()
+            # Restrict access before accepting any connection
+            os.chmod(socket_path, 0o600)
+            self.server.server_activate()
+        except:
+            self.server.server_close()
+            raise
+        self.server.broker = self
+
+    def serve_forever(self):
+        """Handle client requests until shutdown is called."""
+        self.server.serve_forever()
+
+    def shutdown(self):
+        """Stop handling client requests and remove the socket."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.token_cache.clear()
+        os.remove(self.socket_path)
+
+    def handle(self, operation: int, key: str, expiry: float, token: str) -> tuple:
+        """
+        :return: A tuple (status, expiry, token).
+        """
+        try:
+            if operation == GET:
+                auth = self.auths.get(key)
+                while True:
+                    if auth:
+                        self.token_cache.get_token(
+                            key, auth.request_new_token, background_refresh=True
+                        )
+                    else:
+                        self.token_cache.get_token(key)
+                    # Token and expiry are read at once, token might be replaced (or evicted) concurrently
+                    cached = self.token_cache.tokens.get(key)
+                    if cached:
+                        return OK, cached[1], cached[0]
+            if operation == PUT:
+                self.token_cache._add_token(key, token, expiry)
+                return OK, expiry, ""
+            if operation == DELETE:
+                self.token_cache.invalidate_token(key, token)
+                return OK, 0, ""
+            return FAILED, 0, f"Unknown operation {operation}."
+        except AuthenticationFailed:
+            return NOT_FOUND, 0, ""
+        except Exception as e:
+            logger.exception(f'Unable to provide token with "{key}" key.')
+            return FAILED, 0, str(e)
+
+
+class BrokerTokenCache(oauth2_tokens.TokenMemoryCache):
+    """
+    Class to manage tokens using a TokenBroker.
+
+    Tokens are requested to the broker when missing or expired. If the broker does not handle the authentication,
+    token is requested by this process and sent to the broker.
+    Tokens are managed in memory if the broker cannot be reached.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 60, **kwargs):
+        """
+        :param socket_path: Location of the broker Unix domain socket.
+        :param timeout: Maximum amount of seconds to wait for the broker to answer (including token request).
+        Wait for 1 minute by default.
+        :param kwargs: TokenMemoryCache parameters.
+        """
+        oauth2_tokens.TokenMemoryCache.__init__(self, **kwargs)
+        self.socket_path = socket_path
+        self.timeout = timeout
+        # Idle connections to the broker, a connection being used by a single request at a time
+        self.connections: List[socket.socket] = []
+        self.connection_lock = threading.Lock()
+
+    def get_token(
+        self, key: str, on_missing_token=None, *on_missing_token_args, **kwargs
+    ) -> str:
+        cached = self.tokens.get(key)
+        if not cached or self._is_expired(key, cached[1]):
+            response = self._send(GET, key)
+            if response and response[0] == OK:
+                _, expiry, token = response
+                with self.forbid_concurrent_cache_access:
+                    self.tokens = {**self.tokens, key: (token, expiry)}
+        return oauth2_tokens.TokenMemoryCache.get_token(
+            self, key, on_missing_token, *on_missing_token_args, **kwargs
+        )
+
+    def _save_token(self, key: str):
+        cached = self.tokens.get(key)
+        if cached:
+            self._send(PUT, key, cached[0], cached[1])
+
+    def invalidate_token(self, key: str, token: str) -> bool:
+        self._send(DELETE, key, token)
+        return oauth2_tokens.TokenMemoryCache.invalidate_token(self, key, token)
+
+    def _clear(self):
+        with self.connection_lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            connection.close()
+
+    def _connect(self) -> socket.socket:
+        """Return an idle connection to the broker (or a new one if every connection is in use)."""
+        with self.connection_lock:
+            if self.connections:
+                return self.connections.pop()
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.settimeout(self.timeout)
+            connection.connect(self.socket_path)
+        except:
+            connection.close()
+            raise
+        return connection
+
+    def _send(
+        self, operation: int, key: str, token: str = "", expiry: float = 0
+    ) -> Optional[tuple]:
+        """
+        :return: A tuple (status, expiry, token) or None if broker cannot be reached.
+        """
+        key = key.encode()
+        token = token.encode()
+        request = _request_header.pack(operation, expiry, len(key), len(token))
+        connection = None
+        try:
+            # Requests of other threads (for other keys) are not waiting for this one
+            connection = self._connect()
+            connection.sendall(request + key + token)
+            status, expiry, token_length = _response_header.unpack(
+                _receive(connection, _response_header.size)
+            )
+            token = _receive(connection, token_length).decode()
+        except OSError:
+            logger.warning("Token broker cannot be reached.", exc_info=True)
+            if connection:
+                connection.close()
+            return
+        with self.connection_lock:
+            self.connections.append(connection)
+        if status == FAILED:
+            logger.warning(f"Token broker failed to provide token: {token}")
+        return status, expiry, token
@@ -128,3 +128,13 @@ class TokenExpiryNotProvided(Exception):
 
     def __init__(self, token_body: dict):
         Exception.__init__(self, f"Expiry (exp) is not provided in {token_body}.")
+
+
+class CircuitBreakerOpen(Exception):
+    """ Token endpoint is not requested after too many consecutive failures. """
+
+    def __init__(self, url: str):
+        Exception.__init__(
+            self,
+            f"{url} is not requested after too many consecutive failures, retry later.",
+        )
@@ -0,0 +1,292 @@
+"""
+Metrics (and traces) reported by token caches, token requests and OAuth2 authentication classes.
+
+Nothing is reported by default. Provide an Instrumentation using set_instrumentation to receive measurements:
+PrometheusInstrumentation and OpenTelemetryInstrumentation are provided, other systems can be used by inheriting
+from Instrumentation.
+"""
+
+import time
+from typing import Optional
+
+
+class Instrumentation:
+    """
+    Receive measurements, every method does nothing by default.
+    Methods are called by the thread performing the measured operation, they should not block.
+    """
+
+    def cache_hit(self, key: str):
+        """
+        A token was retrieved from the token cache (including an expired token used within grace period).
+
+        :param key: key identifier of the token.
+        """
+
+    def cache_miss(self, key: str):
+        """
+        A token could not be retrieved from the token cache (it will be requested if possible).
+
+        :param key: key identifier of the token.
+        """
+
+    def cache_eviction(self, key: str, reason: str):
+        """
+        A token was removed from the token cache before being retrieved.
+
+        :param key: key identifier of the token.
+        :param reason: "size" if cache was full (max_size), "expired" once expired (evict_expired_tokens).
+        """
+
+    def lock_wait(self, key: str, duration: float):
+        """
+        Time spent waiting for the token cache (or for a pending request of the same token) when retrieving a token
+        that was not in cache.
+
+        :param key: key identifier of the token.
+        :param duration: Number of seconds spent waiting.
+        """
+
+    def token_request(
+        self, token_url: str, duration: float, error: Optional[Exception]
+    ):
+        """
+        A token was requested to a token endpoint (including retries).
+
+        :param token_url: Token endpoint URL.
+        :param duration: Number of seconds until the token was received (or request failed).
+        :param error: Exception that was raised if request failed, None otherwise.
+        """
+
+    def browser_flow(
+        self, grant_name: str, duration: float, error: Optional[Exception]
+    ):
+        """
+        A grant was requested to the user via a browser.
+
+        :param grant_name: Name of the requested grant (code, token, id_token...).
+        :param duration: Number of seconds until the grant was received (or request failed).
+        :param error: Exception that was raised if request failed, None otherwise.
+        """
+
+    def authentication(self, name: str, duration: float, error: Optional[Exception]):
+        """
+        Authentication was added to a request by an OAuth2 authentication.
+
+        :param name: Name of the authentication class.
+        :param duration: Number of seconds spent (including token retrieval).
+        :param error: Exception that was raised if authentication failed, None otherwise.
+        """
+
+
+# Instrumentation in use. Measurements are only performed if enabled.
+active = Instrumentation()
+enabled = False
+
+
+def set_instrumentation(instrumentation: Optional[Instrumentation]):
+    """
+    :param instrumentation: Instrumentation receiving measurements, None to stop measuring.
+    """
+    global active, enabled
+    active = instrumentation or Instrumentation()
+    enabled = instrumentation is not None
+
+
+def timed(measurement: str, name: str, function, *args):
+    """
+    Call function and report its duration and error (if any) to the active instrumentation.
+
+    :param measurement: Name of the Instrumentation method receiving (name, duration, error).
+    :param name: First argument provided to the Instrumentation method.
+    :return: Function result.
+    """
+    start = time.perf_counter()
+    try:
+        result = function(*args)
+    except Exception as e:
+        getattr(active, measurement)(name, time.perf_counter() - start, e)
+        raise
+    getattr(active, measurement)(name, time.perf_counter() - start, None)
+    return result
+
+
+def _error_name(error: Optional[Exception]) -> str:
+    return type(error).__name__ if error else ""
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """Report measurements as Prometheus metrics (using prometheus_client)."""
+
+    def __init__(self, registry=None, namespace: str = "requests_auth"):
+        """
+        :param registry: prometheus_client registry. Default registry by default.
+        :param namespace: Prefix of every metric name.
+        """
+        try:
+            import prometheus_client
+        except ImportError:
+            raise Exception(
+                "PrometheusInstrumentation requires prometheus_client module."
+            )
+
+        kwargs = {"namespace": namespace}
+        if registry is not None:
+            kwargs["registry"] = registry
+        cache_requests = prometheus_client.Counter(
+            "token_cache_requests",
+            "Token retrievals from token cache.",
+            ["result"],
+            **kwargs,
+        )
+        # Label values are resolved once as cache hits are reported on every request
+        self.cache_hits = cache_requests.labels("hit")
+        self.cache_misses = cache_requests.labels("miss")
+        self.cache_evictions = prometheus_client.Counter(
+            "token_cache_evictions",
+            "Tokens removed from token cache before being retrieved.",
+            ["reason"],
+            **kwargs,
+        )
+        self.lock_waits = prometheus_client.Histogram(
+            "token_cache_lock_wait_seconds",
+            "Time spent waiting for token cache when retrieving a token that was not in cache.",
+            **kwargs,
+        )
+        self.token_requests = prometheus_client.Histogram(
+            "token_request_duration_seconds",
+            "Duration of token requests.",
+            ["token_url", "error"],
+            **kwargs,
+        )
+        self.browser_flows = prometheus_client.Histogram(
+            "browser_flow_duration_seconds",
+            "Duration of grant requests via a browser.",
+            ["grant", "error"],
+            **kwargs,
+        )
+        self.authentications = prometheus_client.Histogram(
+            "authentication_duration_seconds",
+            "Time spent adding OAuth2 authentication to requests.",
+            ["authentication", "error"],
+            **kwargs,
+        )
+
+    def cache_hit(self, key: str):
+        self.cache_hits.inc()
+
+    def cache_miss(self, key: str):
+        self.cache_misses.inc()
+
+    def cache_eviction(self, key: str, reason: str):
+        self.cache_evictions.labels(reason).inc()
+
+    def lock_wait(self, key: str, duration: float):
+        self.lock_waits.observe(duration)
+
+    def token_request(
+        self, token_url: str, duration: float, error: Optional[Exception]
+    ):
+        self.token_requests.labels(token_url, _error_name(error)).observe(duration)
+
+    def browser_flow(
+        self, grant_name: str, duration: float, error: Optional[Exception]
+    ):
+        self.browser_flows.labels(grant_name, _error_name(error)).observe(duration)
+
+    def authentication(self, name: str, duration: float, error: Optional[Exception]):
+        self.authentications.labels(name, _error_name(error)).observe(duration)
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    Report measurements as OpenTelemetry metrics, token requests and browser flows being also reported as spans.
+    """
+
+    def __init__(self, meter=None, tracer=None):
+        """
+        :param meter: opentelemetry.metrics.Meter. Meter of the global meter provider by default.
+        :param tracer: opentelemetry.trace.Tracer. Tracer of the global tracer provider by default.
+        """
+        try:
+            from opentelemetry import metrics, trace
+        except ImportError:
+            raise Exception(
+                "OpenTelemetryInstrumentation requires opentelemetry-api module."
+            )
+
+        self.status_error = trace.StatusCode.ERROR
+        meter = meter or metrics.get_meter("requests_auth")
+        self.tracer = tracer or trace.get_tracer("requests_auth")
+        self.cache_requests = meter.create_counter(
+            "requests_auth.token_cache.requests",
+            unit="1",
+            description="Token retrievals from token cache.",
+        )
+        self.cache_evictions = meter.create_counter(
+            "requests_auth.token_cache.evictions",
+            unit="1",
+            description="Tokens removed from token cache before being retrieved.",
+        )
+        self.lock_waits = meter.create_histogram(
+            "requests_auth.token_cache.lock_wait",
+            unit="s",
+            description="Time spent waiting for token cache when retrieving a token that was not in cache.",
+        )
+        self.token_requests = meter.create_histogram(
+            "requests_auth.token_request.duration",
+            unit="s",
+            description="Duration of token requests.",
+        )
+        self.browser_flows = meter.create_histogram(
+            "requests_auth.browser_flow.duration",
+            unit="s",
+            description="Duration of grant requests via a browser.",
+        )
+        self.authentications = meter.create_histogram(
+            "requests_auth.authentication.duration",
+            unit="s",
+            description="Time spent adding OAuth2 authentication to requests.",
+        )
+
+    def cache_hit(self, key: str):
+        self.cache_requests.add(1, {"result": "hit"})
+
+    def cache_miss(self, key: str):
+        self.cache_requests.add(1, {"result": "miss"})
+
+    def cache_eviction(self, key: str, reason: str):
+        self.cache_evictions.add(1, {"reason": reason})
+
+    def lock_wait(self, key: str, duration: float):
+        self.lock_waits.record(duration)
+
+    def _span(self, name: str, duration: float, attributes: dict, error):
+        # Measurement is reported once completed, span is created afterwards with its actual start time
+        end = time.time_ns()
+        span = self.tracer.start_span(
+            name, start_time=end - int(duration * 1e9), attributes=attributes
+        )
+        if error:
+            span.record_exception(error)
+            span.set_status(self.status_error)
+        span.end(end_time=end)
+
+    def token_request(
+        self, token_url: str, duration: float, error: Optional[Exception]
+    ):
+        attributes = {"token_url": token_url, "error": _error_name(error)}
+        self.token_requests.record(duration, attributes)
+        self._span("requests_auth token request", duration, attributes, error)
+
+    def browser_flow(
+        self, grant_name: str, duration: float, error: Optional[Exception]
+    ):
+        attributes = {"grant": grant_name, "error": _error_name(error)}
+        self.browser_flows.record(duration, attributes)
+        self._span("requests_auth browser flow", duration, attributes, error)
+
+    def authentication(self, name: str, duration: float, error: Optional[Exception]):
+        self.authentications.record(
+            duration, {"authentication": name, "error": _error_name(error)}
+        )
@@ -0,0 +1,97 @@
+"""
+Decoding of JSON Web Token claims, as described in https://tools.ietf.org/html/rfc7519
+
+Signature is not validated, claims are only used to know how to handle a token received from a trusted server.
+"""
+
+import base64
+import json
+import threading
+from typing import Optional
+
+from requests_auth.errors import InvalidToken
+
+# Maximum number of decoded claims kept in memory
+MEMO_SIZE = 256
+
+# Signature to (token body, claims), oldest decoded claims first
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+class Claims:
+    """Claims of a JSON Web Token body. Values must not be modified as claims are shared."""
+
+    def __init__(self, values: dict):
+        """
+        :param values: Decoded token body.
+        """
+        self.values = values
+
+    @property
+    def expiry(self) -> Optional[float]:
+        """UTC timestamp of expiry (exp claim)."""
+        return self.values.get("exp")
+
+    @property
+    def not_before(self) -> Optional[float]:
+        """UTC timestamp before which token must not be accepted (nbf claim)."""
+        return self.values.get("nbf")
+
+    @property
+    def issued_at(self) -> Optional[float]:
+        """UTC timestamp of token issuance (iat claim)."""
+        return self.values.get("iat")
+
+    @property
+    def scopes(self) -> set:
+        """Scopes granted to the token (space separated scope claim, or scp claim as sent by some providers)."""
+        scopes = self.values.get("scope", self.values.get("scp"))
+        if isinstance(scopes, str):
+            return set(scopes.split())
+        return set(scopes or ())
+
+
+def decode_base64url(data: str) -> bytes:
+    """
+    Decode URL safe base64 data, padding being optional (as in JSON Web Tokens).
+
+    :param data: URL safe base64 encoded string.
+    """
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def decode_claims(token: str) -> Claims:
+    """
+    Return the claims of a JSON Web Token.
+    Claims of the latest MEMO_SIZE tokens are kept so that a token is decoded only once.
+
+    :param token: JSON Web Token (header.body.signature).
+    :raise InvalidToken: In case token body cannot be decoded.
+    """
+    try:
+        header, body, signature = token.split(".")
+    except ValueError:
+        raise InvalidToken("JSON Web Token")
+
+    # Tokens without signature cannot be identified by it
+    memoized = _memo.get(signature) if signature else None
+    # Body is compared as signature is not validated
+    if memoized and memoized[0] == body:
+        return memoized[1]
+
+    try:
+        values = json.loads(decode_base64url(body))
+    except ValueError:  # Including invalid base64 and UTF-8
+        raise InvalidToken("JSON Web Token")
+    if not isinstance(values, dict):
+        raise InvalidToken("JSON Web Token")
+    claims = Claims(values)
+
+    if signature:
+        with _memo_lock:
+            _memo.pop(signature, None)
+            if len(_memo) >= MEMO_SIZE:
+                del _memo[next(iter(_memo))]
+            _memo[signature] = body, claims
+    return claims
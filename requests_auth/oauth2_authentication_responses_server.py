@@ -5,11 +5,16 @@ from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 from socket import socket
 
+from requests_auth import instrumentation
 from requests_auth.errors import *
 
 logger = logging.getLogger(__name__)
 
 
+def _without_query(path: str) -> str:
+    return path.split("?", 1)[0]
+
+
 class OAuth2ResponseHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         # Do not consider a favicon request as an error
@@ -19,7 +24,8 @@ class OAuth2ResponseHandler(BaseHTTPRequestHandler):
             )
             return self.send_html("Favicon is not provided.")
 
-        logger.debug(f"GET received on {self.path}")
+        # Query string is not logged as it might contain a grant
+        logger.debug("GET received on %s", _without_query(self.path))
         try:
             args = self._get_params()
             if self.server.grant_details.name in args or args.pop(
@@ -37,7 +43,7 @@ class OAuth2ResponseHandler(BaseHTTPRequestHandler):
             )
 
     def do_POST(self):
-        logger.debug(f"POST received on {self.path}")
+        logger.debug("POST received on %s", _without_query(self.path))
         try:
             form_dict = self._get_form()
             self._parse_grant(form_dict)
@@ -54,13 +60,13 @@ class OAuth2ResponseHandler(BaseHTTPRequestHandler):
             if "error" in arguments:
                 raise InvalidGrantRequest(arguments)
             raise GrantNotProvided(self.server.grant_details.name, arguments)
-        logger.debug(f"Received grants: {grants}")
+        logger.debug("Received %s.", self.server.grant_details.name)
         grant = grants[0]
 
         states = arguments.get("state")
         if not states or len(states) > 1:
             raise StateNotProvided(arguments)
-        logger.debug(f"Received states: {states}")
+        logger.debug("Received states: %s", states)
         state = states[0]
         self.server.grant = state, grant
         self.send_html(
@@ -125,6 +131,13 @@ class OAuth2ResponseHandler(BaseHTTPRequestHandler):
         window.location.replace(new_url)
         </script></body></html>"""
 
+    def log_request(self, code="-", size="-"):
+        """Log the request without its query string as it might contain a grant."""
+        if logger.isEnabledFor(logging.DEBUG):
+            self.log_message(
+                '"%s %s" %s %s', self.command, _without_query(self.path), code, size
+            )
+
     def log_message(self, format: str, *args):
         """Make sure that messages are logged even with pythonw (seems like a bug in BaseHTTPRequestHandler)."""
         logger.debug(format, *args)
@@ -154,7 +167,7 @@ class FixedHttpServer(HTTPServer):
             self, ("", grant_details.redirect_uri_port), OAuth2ResponseHandler
         )
         self.timeout = grant_details.reception_timeout
-        logger.debug(f"Timeout is set to {self.timeout} seconds.")
+        logger.debug("Timeout is set to %s seconds.", self.timeout)
         self.grant_details = grant_details
         self.request_error = None
         self.grant = False
@@ -183,8 +196,15 @@ def request_new_grant(grant_details: GrantDetails) -> (str, str):
     :raises GrantNotProvided: If grant is not provided in response (but no error occurred).
     :raises StateNotProvided: If state if not provided in addition to the grant.
     """
-    logger.debug(f"Requesting new {grant_details.name}...")
+    logger.debug("Requesting new %s...", grant_details.name)
+    if instrumentation.enabled:
+        return instrumentation.timed(
+            "browser_flow", grant_details.name, _request_new_grant, grant_details
+        )
+    return _request_new_grant(grant_details)
+
 
+def _request_new_grant(grant_details: GrantDetails) -> (str, str):
     with FixedHttpServer(grant_details) as server:
         _open_url(grant_details.url)
         return _wait_for_grant(server)
@@ -200,7 +220,7 @@ def _open_url(url: str):
             if hasattr(webbrowser, "iexplore")
             else webbrowser.get()
         )
-        logger.debug(f"Opening browser on {url}")
+        logger.debug("Opening browser on %s", url)
         if not browser.open(url, new=1):
             logger.warning("Unable to open URL, try with a GET request.")
             requests.get(url)
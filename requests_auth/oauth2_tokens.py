@@ -1,9 +1,29 @@
 import base64
+import collections
+import contextlib
+import hashlib
+import heapq
+import itertools
 import json
+import mmap
 import os
+import sqlite3
+import struct
+import tempfile
 import datetime
 import threading
+import time
 import logging
+import warnings
+import zlib
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+from requests_auth import instrumentation, jwt_claims
 from requests_auth.errors import *
 
 logger = logging.getLogger(__name__)
@@ -12,10 +32,15 @@ logger = logging.getLogger(__name__)
 def decode_base64(base64_encoded_string: str) -> str:
     """
     Decode base64, padding being optional.
+    Deprecated: bearer token claims are decoded by requests_auth.jwt_claims.
 
     :param base64_encoded_string: Base64 data as an ASCII byte string
     :returns: The decoded byte string.
     """
+    warnings.warn(
+        "decode_base64 will be removed in the future. Use requests_auth.jwt_claims instead.",
+        DeprecationWarning,
+    )
     missing_padding = len(base64_encoded_string) % 4
     if missing_padding != 0:
         base64_encoded_string += "=" * (4 - missing_padding)
@@ -23,7 +48,104 @@ def decode_base64(base64_encoded_string: str) -> str:
 
 
 def is_expired(expiry: float) -> bool:
-    return datetime.datetime.utcfromtimestamp(expiry) < datetime.datetime.utcnow()
+    return expiry < time.time()
+
+
+class _Scheduler:
+    """
+    Call functions at a given time within a background (daemon) thread.
+    Only the latest function scheduled for a task key will be called.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # Heap of (time, sequence, task key), sequence being used to never compare task keys
+        self.tasks = []
+        self.sequence = itertools.count()
+        # Task key to (time, function, args)
+        self.scheduled = {}
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def schedule(self, task_key, at: float, function, *args):
+        """
+        :param task_key: identifier of the task. Any previously scheduled function for this key will not be called.
+        :param at: time.monotonic value of the call.
+        :param function: function to call.
+        :param args: arguments of the function.
+        """
+        with self.condition:
+            self.scheduled[task_key] = at, function, args
+            heapq.heappush(self.tasks, (at, next(self.sequence), task_key))
+            # Thread is not running anymore in a forked process
+            if not self.thread or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self.thread.start()
+            self.condition.notify()
+
+    def cancel(self, task_key=None):
+        """
+        :param task_key: identifier of the task to cancel. Every scheduled call is cancelled by default.
+        """
+        with self.condition:
+            if task_key is None:
+                self.tasks = []
+                self.scheduled = {}
+            else:
+                # Heap entry is discarded once reached
+                self.scheduled.pop(task_key, None)
+            # Thread stops once there is nothing left to call
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                task = self._wait_for_next_task()
+                if task is None:
+                    # A new thread will be started on next schedule
+                    self.thread = None
+                    return
+                at, function, args = task
+            try:
+                function(*args)
+            except:
+                logger.exception("Scheduled call to %s failed.", function)
+
+    def _wait_for_next_task(self) -> Optional[tuple]:
+        """
+        :return: (time, function, args) of the next call or None if there is nothing left to call.
+        """
+        while True:
+            if not self.tasks:
+                return
+            at, _, task_key = self.tasks[0]
+            scheduled = self.scheduled.get(task_key)
+            if not scheduled or scheduled[0] != at:
+                # Cancelled or rescheduled
+                heapq.heappop(self.tasks)
+                continue
+            delay = at - time.monotonic()
+            if delay > 0:
+                self.condition.wait(delay)
+                continue
+            heapq.heappop(self.tasks)
+            return self.scheduled.pop(task_key)
+
+
+@contextlib.contextmanager
+def _lock_byte(file, offset: int):
+    """
+    Lock a byte of a file (even after its end) for this process, waiting for other processes to release it.
+    As any lock held by a process is released when one of its file descriptors on the file is closed,
+    file should be kept open.
+    """
+    fcntl.lockf(file, fcntl.LOCK_EX, 1, offset)
+    try:
+        yield
+    finally:
+        fcntl.lockf(file, fcntl.LOCK_UN, 1, offset)
 
 
 class TokenMemoryCache:
@@ -31,116 +153,576 @@ class TokenMemoryCache:
     Class to manage tokens using memory storage.
     """
 
-    def __init__(self):
+    # Number of seconds before retrying a failed background token request, doubled after every failure
+    refresh_retry_delay = 1
+
+    def __init__(
+        self,
+        early_refresh_ratio: float = None,
+        stale_token_grace_period: float = None,
+        max_size: int = None,
+        evict_expired_tokens: bool = False,
+        expiry_margin: float = 0,
+    ):
+        """
+        :param early_refresh_ratio: Ratio of token lifetime left when a new token should be requested in background.
+        For instance 0.1 to request a new token when only 10% of its lifetime is left.
+        Only applies to tokens that can be requested without user interaction (client credentials, resource owner
+        password credentials). Tokens are requested once expired by default.
+        :param stale_token_grace_period: Number of seconds an expired token can still be used while a new token is
+        requested in background. Only applies to tokens that can be requested without user interaction.
+        Expired tokens are never used by default.
+        :param max_size: Maximum number of tokens in cache. The least recently used token is removed when a new
+        token is received while cache is full. Unlimited by default.
+        :param evict_expired_tokens: Remove tokens from cache (in background) as soon as they expire
+        (after stale_token_grace_period), unless they can be refreshed. Expired tokens are removed on next
+        retrieval by default.
+        :param expiry_margin: Number of seconds before actual expiry when a token is considered as expired,
+        so that it is not sent right before it expires (clock skew, request duration). For instance 30.
+        Tokens are used until they expire by default.
+        """
+        if early_refresh_ratio is not None and not 0 < early_refresh_ratio < 1:
+            raise Exception("early_refresh_ratio must be between 0 and 1 (excluded).")
+        if max_size is not None and max_size < 1:
+            raise Exception("max_size must be a positive integer.")
+        if expiry_margin < 0:
+            raise Exception("expiry_margin cannot be negative.")
+        self.early_refresh_ratio = early_refresh_ratio
+        self.stale_token_grace_period = stale_token_grace_period or 0
+        self.max_size = max_size
+        self.expiry_margin = expiry_margin
+        self.evict_expired_tokens = evict_expired_tokens
+        # Keys ordered from the least to the most recently used (updated without lock), when max_size is set
+        self.last_usages = collections.OrderedDict()
+        # Number of tokens removed because cache was full
+        self.evictions = 0
+        # Number of tokens removed once expired (if evict_expired_tokens is set)
+        self.expired_evictions = 0
+        self.scheduler = _Scheduler("requests_auth token refresh")
+        # Keys of the tokens being requested in background while their expired token is still used
+        self.revalidating = set()
+        # Number of times an expired token was used (within stale_token_grace_period)
+        self.stale_tokens_served = 0
+        # Number of times a token could not be requested in background
+        self.background_refresh_failures = 0
+        # Tokens are never modified in place but replaced by an updated copy (under forbid_concurrent_cache_access)
+        # so that they can be read without lock.
         self.tokens = {}
+        # Key to (expiry, time.monotonic value of expiry), computed once per token and replaced at once
+        self.deadlines = {}
         self.forbid_concurrent_cache_access = threading.Lock()
-        self.forbid_concurrent_missing_token_function_call = threading.Lock()
+        # One [lock, number of users] per key so that tokens for different keys can be requested in parallel,
+        # removed once unused
+        self.missing_token_locks = {}
 
-    def add_bearer_token(self, key: str, token: str):
+    def add_bearer_token(self, key: str, token: str, refresh_token: str = None):
         """
         Set the bearer token and save it
         :param key: key identifier of the token
         :param token: value
+        :param refresh_token: refresh token (if any) that can be used to request a new token
         :raise InvalidToken: In case token is invalid.
         :raise TokenExpiryNotProvided: In case expiry is not provided.
         """
         if not token:
             raise InvalidToken(token)
 
-        header, body, other = token.split(".")
-        body = json.loads(decode_base64(body))
-        expiry = body.get("exp")
+        expiry = jwt_claims.decode_claims(token).expiry
         if not expiry:
             raise TokenExpiryNotProvided(expiry)
 
-        self._add_token(key, token, expiry)
+        self._add_token(key, token, expiry, refresh_token)
 
-    def add_access_token(self, key: str, token: str, expires_in: int):
+    def add_access_token(
+        self, key: str, token: str, expires_in: int, refresh_token: str = None
+    ):
         """
         Set the bearer token and save it
         :param key: key identifier of the token
         :param token: value
         :param expires_in: Number of seconds before token expiry
+        :param refresh_token: refresh token (if any) that can be used to request a new token
         :raise InvalidToken: In case token is invalid.
         """
-        expiry = datetime.datetime.utcnow().replace(
-            tzinfo=datetime.timezone.utc
-        ) + datetime.timedelta(seconds=expires_in)
-        self._add_token(key, token, expiry.timestamp())
+        self._add_token(key, token, time.time() + expires_in, refresh_token)
 
-    def _add_token(self, key: str, token: str, expiry: float):
+    def _add_token(
+        self, key: str, token: str, expiry: float, refresh_token: str = None
+    ):
         """
         Set the bearer token and save it
         :param key: key identifier of the token
         :param token: value
         :param expiry: UTC timestamp of expiry
+        :param refresh_token: refresh token (if any) that can be used to request a new token
         """
+        # Margin is applied once, expiry checks being a single comparison
+        expiry -= self.expiry_margin
+        cached = (token, expiry, refresh_token) if refresh_token else (token, expiry)
         with self.forbid_concurrent_cache_access:
-            self.tokens[key] = token, expiry
-            self._save_tokens()
-            logger.debug(
-                f'Inserting token expiring on {datetime.datetime.utcfromtimestamp(expiry)} (UTC) with "{key}" key: {token}'
-            )
+            self._set_cached(key, cached)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    'Inserting token expiring on %s (UTC) with "%s" key.',
+                    datetime.datetime.utcfromtimestamp(expiry),
+                    key,
+                )
 
-    def get_token(self, key: str, on_missing_token=None, *on_missing_token_args) -> str:
+    def get_token(
+        self,
+        key: str,
+        on_missing_token=None,
+        *on_missing_token_args,
+        background_refresh: bool = False,
+    ) -> str:
         """
         Return the bearer token.
         :param key: key identifier of the token
-        :param on_missing_token: function to call when token is expired or missing (returning token and expiry tuple)
+        :param on_missing_token: function to call when token is expired or missing
+        (returning a (state, token), (state, token, expires_in) or (state, token, expires_in, refresh_token) tuple)
         :param on_missing_token_args: arguments of the function
+        :param background_refresh: on_missing_token does not require user interaction and can be called in background
+        to request a new token before expiry (if early_refresh_ratio is set)
+        or after expiry while still using the expired token (if stale_token_grace_period is set).
         :return: the token
         :raise AuthenticationFailed: in case token cannot be retrieved.
         """
-        logger.debug(f'Retrieving token with "{key}" key.')
-        with self.forbid_concurrent_cache_access:
-            self._load_tokens()
-            if key in self.tokens:
-                bearer, expiry = self.tokens[key]
-                if is_expired(expiry):
-                    logger.debug(f'Authentication token with "{key}" key is expired.')
-                    del self.tokens[key]
-                else:
-                    logger.debug(
-                        f"Using already received authentication, will expire on {datetime.datetime.utcfromtimestamp(expiry)} (UTC)."
-                    )
-                    return bearer
+        bearer = self._get_cached_token(key)
+        if bearer:
+            return bearer
+
+        logger.debug('Retrieving token with "%s" key.', key)
+        with self._waiting_for(key, self.forbid_concurrent_cache_access):
+            bearer = self._get_valid_token(key)
+            if not bearer and background_refresh and on_missing_token is not None:
+                bearer = self._get_stale_token(
+                    key, on_missing_token, on_missing_token_args
+                )
+            if bearer:
+                if instrumentation.enabled:
+                    instrumentation.active.cache_hit(key)
+                return bearer
 
         logger.debug("Token cannot be found in cache.")
+        if instrumentation.enabled:
+            instrumentation.active.cache_miss(key)
         if on_missing_token is not None:
-            with self.forbid_concurrent_missing_token_function_call:
-                new_token = on_missing_token(*on_missing_token_args)
-                if len(new_token) == 2:  # Bearer token
-                    state, token = new_token
-                    self.add_bearer_token(state, token)
-                else:  # Access Token
-                    state, token, expires_in = new_token
-                    self.add_access_token(state, token, expires_in)
-                if key != state:
-                    logger.warning(
-                        f"Using a token received on another key than expected. Expecting {key} but was {state}."
-                    )
+            # Only one call per key at a time, other callers will wait for the result
+            with self._waiting_for(key, self._missing_token_lock(key)):
+                with self.forbid_concurrent_cache_access:
+                    bearer = self._get_valid_token(key)
+                    if bearer:
+                        return bearer
+
+                state = self._add_new_token(
+                    key, on_missing_token(*on_missing_token_args)
+                )
+            if background_refresh:
+                self._schedule_refresh(state, on_missing_token, on_missing_token_args)
             with self.forbid_concurrent_cache_access:
                 if state in self.tokens:
-                    bearer, expiry = self.tokens[state]
-                    logger.debug(
-                        f"Using newly received authentication, expiring on {datetime.datetime.utcfromtimestamp(expiry)} (UTC)."
-                    )
+                    bearer, expiry = self.tokens[state][:2]
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(
+                            "Using newly received authentication, expiring on %s (UTC).",
+                            datetime.datetime.utcfromtimestamp(expiry),
+                        )
                     return bearer
 
+        logger.debug('User was not authenticated: "%s" key cannot be found.', key)
+        raise AuthenticationFailed()
+
+    def _add_new_token(self, key: str, new_token: tuple) -> str:
+        """
+        Store a token as returned by an on_missing_token function.
+        :param key: key identifier of the expected token
+        :param new_token: (state, token) for a bearer token or (state, token, expires_in) for an access token,
+        optionally followed by a refresh token (expires_in being None for a bearer token).
+        :return: the key identifier of the received token
+        """
+        state, token = new_token[:2]
+        expires_in = new_token[2] if len(new_token) > 2 else None
+        refresh_token = new_token[3] if len(new_token) > 3 else None
+        if expires_in:  # Access Token
+            self.add_access_token(state, token, expires_in, refresh_token)
+        else:  # Bearer token
+            self.add_bearer_token(state, token, refresh_token)
+        if key != state:
+            logger.warning(
+                "Using a token received on another key than expected. Expecting %s but was %s.",
+                key,
+                state,
+            )
+        return state
+
+    def _schedule_refresh(self, key: str, on_missing_token, on_missing_token_args):
+        cached = self.tokens.get(key)
+        if not self.early_refresh_ratio or not cached:
+            return
+        now = time.monotonic()
+        refresh_time = now + (self._deadline(key, cached[1]) - now) * (
+            1 - self.early_refresh_ratio
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                'Token with "%s" key will be refreshed on %s (UTC).',
+                key,
+                datetime.datetime.utcfromtimestamp(time.time() + refresh_time - now),
+            )
+        self.scheduler.schedule(
+            key,
+            refresh_time,
+            self._refresh_token,
+            key,
+            on_missing_token,
+            on_missing_token_args,
+        )
+
+    def _schedule_refresh_retry(
+        self, key: str, on_missing_token, on_missing_token_args, failures: int
+    ):
+        """
+        Request a new token in background again (exponential backoff), provided the current token is valid until then.
+        Otherwise a new token will be requested once needed.
+        :param failures: Number of consecutive failures to refresh this token.
+        """
+        cached = self.tokens.get(key)
+        if not cached:
+            return
+        now = time.monotonic()
+        retry_time = now + self.refresh_retry_delay * 2 ** (failures - 1)
+        if retry_time >= self._deadline(key, cached[1]) or self._is_expired(
+            key, cached[1]
+        ):
+            return
         logger.debug(
-            f"User was not authenticated: key {key} cannot be found in {self.tokens}."
+            'Token with "%s" key will be requested again in %s seconds.',
+            key,
+            retry_time - now,
         )
-        raise AuthenticationFailed()
+        self.scheduler.schedule(
+            key,
+            retry_time,
+            self._refresh_token,
+            key,
+            on_missing_token,
+            on_missing_token_args,
+            failures,
+        )
+
+    def _refresh_token(
+        self, key: str, on_missing_token, on_missing_token_args, failures: int = 0
+    ):
+        """
+        :param failures: Number of consecutive failures to refresh this token.
+        """
+        try:
+            with self._missing_token_lock(key):
+                logger.debug('Refreshing token with "%s" key.', key)
+                state = self._add_new_token(
+                    key, on_missing_token(*on_missing_token_args)
+                )
+        except:
+            with self.forbid_concurrent_cache_access:
+                self.background_refresh_failures += 1
+            self._schedule_refresh_retry(
+                key, on_missing_token, on_missing_token_args, failures + 1
+            )
+            raise
+        finally:
+            with self.forbid_concurrent_cache_access:
+                self.revalidating.discard(key)
+        self._schedule_refresh(state, on_missing_token, on_missing_token_args)
+
+    @contextlib.contextmanager
+    def _waiting_for(self, key: str, lock):
+        """
+        Enter lock context, reporting time spent waiting for it to the active instrumentation (if enabled).
+        :param key: key identifier of the token being retrieved
+        """
+        if not instrumentation.enabled:
+            with lock:
+                yield
+            return
+        start = time.perf_counter()
+        with lock:
+            instrumentation.active.lock_wait(key, time.perf_counter() - start)
+            yield
+
+    @contextlib.contextmanager
+    def _missing_token_lock(self, key: str):
+        """
+        Ensure a single token request per key at a time.
+        :param key: key identifier of the token
+        """
+        with self.forbid_concurrent_cache_access:
+            missing_token_lock = self.missing_token_locks.setdefault(
+                key, [threading.Lock(), 0]
+            )
+            missing_token_lock[1] += 1
+        try:
+            with missing_token_lock[0]:
+                yield
+        finally:
+            # Lock is removed only once no thread is holding or waiting for it
+            with self.forbid_concurrent_cache_access:
+                missing_token_lock[1] -= 1
+                if not missing_token_lock[1]:
+                    del self.missing_token_locks[key]
+
+    def _get_stale_token(
+        self, key: str, on_missing_token, on_missing_token_args
+    ) -> Optional[str]:
+        """
+        Return the expired token (within grace period) and request a new one in background.
+        Must be called while holding forbid_concurrent_cache_access.
+        :return: the expired token or None if there is no token usable for this key.
+        """
+        if key not in self.tokens:
+            return
+        bearer = self.tokens[key][0]
+        self.stale_tokens_served += 1
+        if key not in self.revalidating:
+            logger.debug(
+                'Using expired token with "%s" key while requesting a new one.', key
+            )
+            self.revalidating.add(key)
+            self.scheduler.schedule(
+                key,
+                time.monotonic(),
+                self._refresh_token,
+                key,
+                on_missing_token,
+                on_missing_token_args,
+            )
+        return bearer
+
+    def _get_valid_token(self, key: str) -> Optional[str]:
+        """
+        Return the bearer token if it is in cache and not expired.
+        Must be called while holding forbid_concurrent_cache_access.
+        :param key: key identifier of the token
+        :return: the token or None if there is no valid token for this key.
+        """
+        self._load_token(key)
+        if key in self.tokens:
+            bearer, expiry, *refresh_token = self.tokens[key]
+            if refresh_token and self._is_expired(key, expiry):
+                # Keep refresh token to request a new token
+                logger.debug('Authentication token with "%s" key is expired.', key)
+            elif self._is_expired(key, expiry, self.stale_token_grace_period):
+                logger.debug('Authentication token with "%s" key is expired.', key)
+                self._remove_cached(key)
+            elif not self._is_expired(key, expiry):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Using already received authentication, will expire on %s (UTC).",
+                        datetime.datetime.utcfromtimestamp(expiry),
+                    )
+                return bearer
+
+    def get_refresh_token(self, key: str) -> Optional[str]:
+        """
+        Return the refresh token stored alongside the token (even if expired), keeping it in cache.
+        :param key: key identifier of the token
+        :return: the refresh token or None if there is no refresh token for this key.
+        """
+        with self.forbid_concurrent_cache_access:
+            self._load_token(key)
+            cached = self.tokens.get(key)
+            if cached and len(cached) > 2:
+                return cached[2]
+
+    def pop_refresh_token(self, key: str) -> Optional[str]:
+        """
+        Remove and return the refresh token stored alongside the token (even if expired).
+        :param key: key identifier of the token
+        :return: the refresh token or None if there is no refresh token for this key.
+        """
+        with self.forbid_concurrent_cache_access:
+            self._load_token(key)
+            cached = self.tokens.get(key)
+            if not cached or len(cached) < 3:
+                return
+            self._set_cached(key, (cached[0], cached[1]))
+            return cached[2]
+
+    def invalidate_token(self, key: str, token: str) -> bool:
+        """
+        Remove the token from the cache (refresh token is kept), if it is still the one stored with this key.
+        A token that was already replaced (by another thread for instance) is kept.
+        :param key: key identifier of the token
+        :param token: the rejected token
+        :return: True if the token was removed.
+        """
+        with self.forbid_concurrent_cache_access:
+            self._load_token(key)
+            cached = self.tokens.get(key)
+            if not cached or cached[0] != token:
+                return False
+            logger.debug('Removing rejected token with "%s" key.', key)
+            if len(cached) > 2:
+                # Keep refresh token (as an expired token) to request a new token
+                self._set_cached(key, (cached[0], 0, cached[2]))
+            else:
+                self._remove_cached(key)
+            return True
 
     def clear(self):
         with self.forbid_concurrent_cache_access:
             logger.debug("Clearing token cache.")
+            self.scheduler.cancel()
+            self.revalidating = set()
             self.tokens = {}
+            self.last_usages = collections.OrderedDict()
+            self.deadlines = {}
             self._clear()
 
+    def _set_cached(self, key: str, cached: tuple):
+        """
+        Store (token, expiry) or (token, expiry, refresh_token) and save it.
+        Must be called while holding forbid_concurrent_cache_access.
+        """
+        self.deadlines[key] = cached[1], time.monotonic() + cached[1] - time.time()
+        self._store_in_memory(key, cached)
+        self._save_token(key)
+        if self.max_size:
+            self._mark_as_used(key)
+            if len(self.tokens) > self.max_size:
+                self._evict_least_recently_used()
+        if self.evict_expired_tokens and len(cached) < 3:
+            self.scheduler.schedule(
+                ("expiry", key),
+                self._deadline(key, cached[1]) + self.stale_token_grace_period,
+                self._evict_expired_token,
+                key,
+            )
+
+    def _mark_as_used(self, key: str):
+        """Move the key at the end of last usages (might be called without lock)."""
+        try:
+            self.last_usages.move_to_end(key)
+        except KeyError:
+            # Token not used yet (or evicted concurrently, the key is then skipped by eviction)
+            self.last_usages[key] = None
+
+    def _evict_least_recently_used(self):
+        """Must be called while holding forbid_concurrent_cache_access."""
+        key = None
+        if len(self.last_usages) >= len(self.tokens):
+            while self.last_usages and key not in self.tokens:
+                # Skip keys evicted while being marked as used
+                key, _ = self.last_usages.popitem(last=False)
+        if key not in self.tokens:
+            # Tokens loaded (from another process) but never used by this one are removed first
+            key = next(key for key in self.tokens if key not in self.last_usages)
+        logger.debug('Removing least recently used token with "%s" key.', key)
+        self.evictions += 1
+        self._remove_cached(key)
+        if instrumentation.enabled:
+            instrumentation.active.cache_eviction(key, "size")
+
+    def _evict_expired_token(self, key: str):
+        with self.forbid_concurrent_cache_access:
+            cached = self.tokens.get(key)
+            if (
+                cached
+                and len(cached) < 3
+                and self._is_expired(key, cached[1], self.stale_token_grace_period)
+            ):
+                logger.debug('Removing expired token with "%s" key.', key)
+                self.expired_evictions += 1
+                self._remove_cached(key)
+                if instrumentation.enabled:
+                    instrumentation.active.cache_eviction(key, "expired")
+
+    def _get_cached_token(self, key: str) -> Optional[str]:
+        """
+        Fast path: return the token if a valid one is already in memory, without locking or any I/O.
+        :param key: key identifier of the token
+        :return: the token or None if not in memory (or expired)
+        """
+        cached = self.tokens.get(key)
+        if cached and not self._is_expired(key, cached[1]):
+            if self.max_size:
+                self._mark_as_used(key)
+            if instrumentation.enabled:
+                instrumentation.active.cache_hit(key)
+            return cached[0]
+
+    def _deadline(self, key: str, expiry: float) -> float:
+        """
+        Return the time.monotonic value of the token expiry, computed once (when token is received or loaded).
+        :param expiry: UTC timestamp of expiry, as stored alongside the token
+        """
+        deadline = self.deadlines.get(key)
+        if deadline is None or deadline[0] != expiry:
+            deadline = expiry, time.monotonic() + expiry - time.time()
+            self.deadlines[key] = deadline
+        return deadline[1]
+
+    def _is_expired(self, key: str, expiry: float, delay: float = 0) -> bool:
+        """
+        Token is expired once its monotonic deadline is reached (system clock being set back does not matter)
+        or once system clock is past its expiry (monotonic clock might not advance while system is suspended).
+        :param expiry: UTC timestamp of expiry, as stored alongside the token
+        :param delay: Number of seconds after expiry (grace period)
+        """
+        return (
+            self._deadline(key, expiry) + delay < time.monotonic()
+            or expiry + delay < time.time()
+        )
+
+    @property
+    def size(self) -> int:
+        """Number of tokens in cache."""
+        return len(self.tokens)
+
+    def _remove_cached(self, key: str):
+        """
+        Remove the token and save the removal.
+        Must be called while holding forbid_concurrent_cache_access.
+        """
+        self._remove_from_memory(key)
+        self._save_token(key)
+        self.last_usages.pop(key, None)
+        self.deadlines.pop(key, None)
+        # Refreshing an evicted token would add it back (evicting another token once full)
+        self.scheduler.cancel(key)
+        self.scheduler.cancel(("expiry", key))
+
+    def _store_in_memory(self, key: str, cached: tuple):
+        """
+        Tokens are replaced by an updated copy so that they can be iterated without lock.
+        Must be called while holding forbid_concurrent_cache_access.
+        """
+        self.tokens = {**self.tokens, key: cached}
+
+    def _remove_from_memory(self, key: str):
+        """Must be called while holding forbid_concurrent_cache_access."""
+        self.tokens = {
+            cached_key: cached
+            for cached_key, cached in self.tokens.items()
+            if cached_key != key
+        }
+
+    def _save_token(self, key: str):
+        """
+        Save the token stored with this key (or its removal if not in cache anymore).
+        Every token is saved by default.
+        """
+        self._save_tokens()
+
     def _save_tokens(self):
         pass
 
+    def _load_token(self, key: str):
+        """
+        Load the token stored with this key (if it was updated by another cache).
+        Every token is loaded by default.
+        """
+        self._load_tokens()
+
     def _load_tokens(self):
         pass
 
@@ -153,10 +735,45 @@ class JsonTokenFileCache(TokenMemoryCache):
     Class to manage tokens using a cache file.
     """
 
-    def __init__(self, tokens_path: str):
-        TokenMemoryCache.__init__(self)
+    def __init__(self, tokens_path: str, revalidation_interval: float = None, **kwargs):
+        """
+        :param tokens_path: Location of the cache file. Created if it does not exists.
+        :param revalidation_interval: Minimum number of seconds between two checks of the cache file for tokens
+        saved by another process. Cache file is checked every time a token is retrieved by default.
+        :param kwargs: TokenMemoryCache parameters.
+        """
+        TokenMemoryCache.__init__(self, **kwargs)
         self.tokens_path = tokens_path
         self.last_save_time = 0
+        self.revalidation_interval = revalidation_interval
+        # time.monotonic value after which cache file should be checked again
+        self.next_revalidation = 0
+        self._load_tokens()
+
+    def get_token(
+        self, key: str, on_missing_token=None, *on_missing_token_args, **kwargs
+    ) -> str:
+        # Cache file might have been updated by another process
+        if not self.revalidation_interval or time.monotonic() >= self.next_revalidation:
+            with self.forbid_concurrent_cache_access:
+                self._revalidate()
+        return TokenMemoryCache.get_token(
+            self, key, on_missing_token, *on_missing_token_args, **kwargs
+        )
+
+    def _load_token(self, key: str):
+        self._revalidate()
+
+    def _revalidate(self):
+        """
+        Load tokens saved by another process, at most once per revalidation_interval (if set).
+        Must be called while holding forbid_concurrent_cache_access.
+        """
+        if self.revalidation_interval:
+            now = time.monotonic()
+            if now < self.next_revalidation:
+                return
+            self.next_revalidation = now + self.revalidation_interval
         self._load_tokens()
 
     def _clear(self):
@@ -186,3 +803,592 @@ class JsonTokenFileCache(TokenMemoryCache):
                     self.tokens = json.load(tokens_cache_file)
         except:
             logger.exception("Cannot load tokens.")
+
+
+class MultiprocessJsonTokenFileCache(JsonTokenFileCache):
+    """
+    Class to manage tokens using a cache file shared by multiple processes (on the same host).
+
+    Cache file is replaced at once (never read while partially written) and updated under a file lock,
+    so that tokens saved by other processes are never lost.
+    A missing token is requested by a single process at a time, other processes wait for it and use it.
+    """
+
+    def __init__(self, tokens_path: str, **kwargs):
+        """
+        :param tokens_path: Location of the cache file. Created if it does not exists.
+        A lock file is also created alongside it (with .lock extension).
+        :param kwargs: JsonTokenFileCache parameters.
+        """
+        if fcntl is None:
+            raise Exception(
+                "MultiprocessJsonTokenFileCache requires fcntl module (not available on this platform)."
+            )
+        # Kept open: closing any file descriptor on the lock file would release every lock of the process
+        self.lock_file = open(f"{tokens_path}.lock", "a")
+        # (inode, modification time, size) of the loaded cache file
+        self.loaded_file_id = None
+        JsonTokenFileCache.__init__(self, tokens_path, **kwargs)
+
+    def _file_lock(self, offset: int):
+        """
+        Lock a byte of the lock file, waiting for other processes to release it.
+        Byte 0 is used to update the cache file, other bytes are used to request tokens (one per key).
+        """
+        return _lock_byte(self.lock_file, offset)
+
+    @contextlib.contextmanager
+    def _missing_token_lock(self, key: str):
+        # Threads of this process are serialized first as file locks are held per process
+        with TokenMemoryCache._missing_token_lock(self, key):
+            # Different keys might share the same byte, they would then be requested one at a time
+            with self._file_lock(1 + zlib.crc32(key.encode())):
+                # Token might have been saved by another process while waiting (whatever the revalidation interval)
+                with self.forbid_concurrent_cache_access:
+                    self._load_tokens()
+                yield
+
+    def _clear(self):
+        with self._file_lock(0):
+            self.loaded_file_id = None
+            JsonTokenFileCache._clear(self)
+
+    def _save_token(self, key: str):
+        cached = self.tokens.get(key)
+        with self._file_lock(0):
+            # Apply the update on the latest saved tokens
+            self._load_tokens()
+            if cached is None:
+                self.tokens = {
+                    cached_key: cached
+                    for cached_key, cached in self.tokens.items()
+                    if cached_key != key
+                }
+            else:
+                self.tokens = {**self.tokens, key: cached}
+            self._save_tokens()
+
+    def _save_tokens(self):
+        directory = os.path.dirname(os.path.abspath(self.tokens_path))
+        try:
+            fd, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as tokens_cache_file:
+                    json.dump(self.tokens, tokens_cache_file)
+                os.replace(temporary_path, self.tokens_path)
+            except:
+                os.remove(temporary_path)
+                raise
+            self.loaded_file_id = self._file_id(os.stat(self.tokens_path))
+        except:
+            logger.exception("Cannot save tokens.")
+
+    def _load_tokens(self):
+        try:
+            stat = os.stat(self.tokens_path)
+        except FileNotFoundError:
+            logger.debug("No token loaded. Token cache does not exists.")
+            return
+        try:
+            # Cache file is replaced on every save
+            file_id = self._file_id(stat)
+            if file_id != self.loaded_file_id:
+                with open(self.tokens_path, "r") as tokens_cache_file:
+                    self.tokens = json.load(tokens_cache_file)
+                self.loaded_file_id = file_id
+        except:
+            logger.exception("Cannot load tokens.")
+
+    @staticmethod
+    def _file_id(stat: os.stat_result) -> tuple:
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class JournalTokenFileCache(JsonTokenFileCache):
+    """
+    Class to manage tokens using an append-only journal file.
+
+    Every token update is appended to the file as a JSON line ([key, token] or [key, null] for a removal),
+    instead of writing every token on each update.
+    The journal is compacted (replaced by a journal containing only current tokens) once it grows too much.
+    """
+
+    def __init__(self, tokens_path: str, compaction_threshold: int = 1000, **kwargs):
+        """
+        :param tokens_path: Location of the journal file. Created if it does not exists.
+        A lock file is also created alongside it (with .lock extension) if fcntl module is available.
+        :param compaction_threshold: Minimum number of lines before compacting the journal.
+        Journal is compacted once it contains more lines than this threshold and twice the number of tokens.
+        1000 by default.
+        :param kwargs: JsonTokenFileCache parameters.
+        """
+        self.compaction_threshold = compaction_threshold
+        # Kept open: closing any file descriptor on the lock file would release every lock of the process
+        self.lock_file = open(f"{tokens_path}.lock", "a") if fcntl else None
+        # (device, inode) of the loaded journal, a new journal is fully loaded
+        self.journal_id = None
+        # Loaded journal, kept open (if possible) so that its inode is not reused by a compacted journal
+        self.journal = None
+        # Number of bytes and lines of the journal already loaded
+        self.journal_offset = 0
+        self.journal_lines = 0
+        JsonTokenFileCache.__init__(self, tokens_path, **kwargs)
+
+    @contextlib.contextmanager
+    def _journal_lock(self):
+        """
+        Prevent other processes from updating the journal, so that no line is appended to a journal being replaced.
+        Journal is only locked if fcntl module is available.
+        """
+        if self.lock_file is None:
+            yield
+            return
+        with _lock_byte(self.lock_file, 0):
+            yield
+
+    def _clear(self):
+        with self._journal_lock():
+            self._close_journal()
+            self.journal_id = None
+            self.journal_offset = 0
+            self.journal_lines = 0
+            JsonTokenFileCache._clear(self)
+
+    def _save_token(self, key: str):
+        with self._journal_lock():
+            self._append_token(key)
+
+    def _append_token(self, key: str):
+        """Must be called while holding the journal lock."""
+        line = json.dumps([key, self.tokens.get(key)]).encode() + b"\n"
+        try:
+            # Unbuffered so that line is appended at once (never interleaved with lines of other processes)
+            with open(self.tokens_path, "ab+", buffering=0) as journal:
+                size = journal.seek(0, os.SEEK_END)
+                if size:
+                    journal.seek(size - 1)
+                    if journal.read(1) != b"\n":
+                        # Previous line was truncated (interrupted write), do not append to it
+                        line = b"\n" + line
+                journal.write(line)
+        except:
+            logger.exception("Cannot save token.")
+            return
+
+        # Replay appended line (and lines appended by other processes since last load)
+        self._load_tokens()
+        if self.journal_lines > max(self.compaction_threshold, 2 * len(self.tokens)):
+            self._save_tokens()
+
+    def _save_tokens(self):
+        # Current tokens are written to a new file that replaces the journal at once
+        directory = os.path.dirname(os.path.abspath(self.tokens_path))
+        try:
+            fd, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as journal:
+                    for key, cached in self.tokens.items():
+                        journal.write(json.dumps([key, cached]).encode() + b"\n")
+                os.replace(temporary_path, self.tokens_path)
+            except:
+                os.remove(temporary_path)
+                raise
+            self.journal_offset = self._open_journal().st_size
+            self.journal_lines = len(self.tokens)
+            logger.debug("Tokens journal compacted to %d lines.", len(self.tokens))
+        except:
+            logger.exception("Cannot save tokens.")
+
+    def _load_tokens(self):
+        try:
+            stat = os.stat(self.tokens_path)
+        except FileNotFoundError:
+            logger.debug("No token loaded. Token cache does not exists.")
+            return
+        try:
+            if self.journal_id != (stat.st_dev, stat.st_ino):
+                # Journal was compacted (or created) since last load
+                stat = self._open_journal()
+                self.journal_offset = 0
+                self.journal_lines = 0
+                self.tokens = {}
+            if stat.st_size > self.journal_offset:
+                if self.journal:
+                    self.journal.seek(self.journal_offset)
+                    self._replay(self.journal)
+                else:
+                    with open(self.tokens_path, "rb") as journal:
+                        journal.seek(self.journal_offset)
+                        self._replay(journal)
+        except:
+            logger.exception("Cannot load tokens.")
+
+    def _open_journal(self) -> os.stat_result:
+        """
+        Identify (and keep open if possible) the current journal instead of the previously loaded one.
+        :return: Status of the current journal.
+        """
+        self._close_journal()
+        journal = open(self.tokens_path, "rb")
+        stat = os.fstat(journal.fileno())
+        self.journal_id = stat.st_dev, stat.st_ino
+        if fcntl:
+            # Otherwise a compacted journal might reuse the inode and would not be reloaded.
+            # Not kept open on Windows, where an open file cannot be replaced.
+            self.journal = journal
+        else:
+            journal.close()
+        return stat
+
+    def _close_journal(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def _replay(self, journal):
+        updates = {}
+        for line in journal:
+            if not line.endswith(b"\n"):
+                # Line is being written (or was truncated), it will be replayed once complete
+                break
+            self.journal_offset += len(line)
+            if not line.strip():
+                continue
+            self.journal_lines += 1
+            try:
+                key, cached = json.loads(line)
+            except ValueError:
+                # Line is not logged as it might contain a token
+                logger.warning(
+                    "Ignoring invalid tokens journal line (%d bytes ending at offset %d).",
+                    len(line),
+                    self.journal_offset,
+                )
+                continue
+            updates[key] = tuple(cached) if cached else None
+
+        # Lines appended by this cache are already in tokens, avoid copying them for nothing
+        if any(self.tokens.get(key) != cached for key, cached in updates.items()):
+            tokens = {**self.tokens, **updates}
+            self.tokens = {
+                key: cached for key, cached in tokens.items() if cached is not None
+            }
+
+
+class SqliteTokenCache(TokenMemoryCache):
+    """
+    Class to manage tokens using a SQLite database.
+
+    Only the requested token is read (and only the updated token is written) on each access,
+    making it suitable for a large number of tokens. Database can be shared by multiple processes.
+    Tokens are updated in place in memory (never iterated without lock), instead of being copied on every update.
+    """
+
+    def __init__(
+        self,
+        database_path: str,
+        journal_mode: str = "wal",
+        timeout: float = 5.0,
+        **kwargs,
+    ):
+        """
+        :param database_path: Location of the database file. Created if it does not exists.
+        :param journal_mode: SQLite journal mode. wal by default, allowing to read while a token is written.
+        WAL requires every process to be on the same host, use delete if database is on a network file system.
+        :param timeout: Maximum amount of seconds to wait for the database to be unlocked by another process.
+        Wait for 5 seconds by default.
+        :param kwargs: TokenMemoryCache parameters.
+        """
+        TokenMemoryCache.__init__(self, **kwargs)
+        self.database_path = database_path
+        # Statements are executed one at a time (under forbid_concurrent_cache_access) and committed at once
+        self.connection = sqlite3.connect(
+            database_path,
+            timeout=timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.connection.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "key TEXT PRIMARY KEY, token TEXT NOT NULL, expiry REAL NOT NULL, refresh_token TEXT"
+            ")"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS tokens_expiry ON tokens (expiry)"
+        )
+
+    def get_token(
+        self, key: str, on_missing_token=None, *on_missing_token_args, **kwargs
+    ) -> str:
+        # Token might have been updated by another process
+        with self.forbid_concurrent_cache_access:
+            self._load_token(key)
+        return TokenMemoryCache.get_token(
+            self, key, on_missing_token, *on_missing_token_args, **kwargs
+        )
+
+    def purge_expired_tokens(self) -> int:
+        """
+        Remove expired tokens (after grace period) from the database, except the ones that can be refreshed.
+        Expired tokens are purged every time a token is saved.
+        :return: Number of removed tokens.
+        """
+        with self.forbid_concurrent_cache_access:
+            return self._purge_expired_tokens()
+
+    def _purge_expired_tokens(self) -> int:
+        purge_before = time.time() - self.stale_token_grace_period
+        purged_keys = self.connection.execute(
+            "SELECT key FROM tokens WHERE expiry < ? AND refresh_token IS NULL",
+            (purge_before,),
+        ).fetchall()
+        if not purged_keys:
+            return 0
+        self.connection.execute(
+            "DELETE FROM tokens WHERE expiry < ? AND refresh_token IS NULL",
+            (purge_before,),
+        )
+        for (key,) in purged_keys:
+            self._remove_from_memory(key)
+            self.last_usages.pop(key, None)
+            self.deadlines.pop(key, None)
+        return len(purged_keys)
+
+    def _clear(self):
+        self.connection.execute("DELETE FROM tokens")
+
+    def _save_token(self, key: str):
+        cached = self.tokens.get(key)
+        if cached is None:
+            self.connection.execute("DELETE FROM tokens WHERE key = ?", (key,))
+            return
+        token, expiry, *refresh_token = cached
+        self.connection.execute(
+            "INSERT OR REPLACE INTO tokens (key, token, expiry, refresh_token) VALUES (?, ?, ?, ?)",
+            (key, token, expiry, refresh_token[0] if refresh_token else None),
+        )
+        self._purge_expired_tokens()
+
+    def _load_token(self, key: str):
+        row = self.connection.execute(
+            "SELECT token, expiry, refresh_token FROM tokens WHERE key = ?", (key,)
+        ).fetchone()
+        stored = (row if row[2] else row[:2]) if row else None
+        if self.tokens.get(key) == stored:
+            return
+        if stored is None:
+            self._remove_from_memory(key)
+        else:
+            self._store_in_memory(key, stored)
+
+    def _store_in_memory(self, key: str, cached: tuple):
+        self.tokens[key] = cached
+
+    def _remove_from_memory(self, key: str):
+        self.tokens.pop(key, None)
+
+
+class SharedMemoryTokenCache(TokenMemoryCache):
+    """
+    Class to manage tokens using a memory mapped file shared by multiple processes (on the same host).
+
+    File contains a fixed number of fixed size slots, a token being stored in a slot depending on its key.
+    Tokens are read without lock nor parsing (a sequence number ensures that a slot is not read while written).
+    A missing token is requested by a single process at a time, other processes wait for it and use it.
+    """
+
+    # sequence, sha512 digest of the key, expiry, token length, refresh token length
+    _slot_header = struct.Struct("<Q64sdII")
+    _sequence = struct.Struct("<Q")
+    # Number of slots where a token can be stored
+    _probes = 8
+    # Number of times a slot being written is read again before checking that its writer is still alive
+    _spins = 1000
+
+    def __init__(self, path: str, slots: int = 1024, slot_size: int = 4096, **kwargs):
+        """
+        :param path: Location of the shared file. Created if it does not exists.
+        On Linux, a file in /dev/shm is never written to disk.
+        :param slots: Number of tokens that can be stored. 1024 by default.
+        Every process must use the same value.
+        :param slot_size: Maximum size (in bytes) of a token (including refresh token) plus 88 bytes.
+        4096 by default. Every process must use the same value. Tokens that do not fit are only cached in memory.
+        :param kwargs: TokenMemoryCache parameters.
+        """
+        if fcntl is None:
+            raise Exception(
+                "SharedMemoryTokenCache requires fcntl module (not available on this platform)."
+            )
+        if slot_size <= self._slot_header.size:
+            raise Exception(
+                f"slot_size must be greater than {self._slot_header.size} bytes."
+            )
+        TokenMemoryCache.__init__(self, **kwargs)
+        self.slots = slots
+        self.slot_size = slot_size
+        size = slots * slot_size
+        # Kept open: closing any file descriptor on the file would release every lock of the process
+        self.file = open(path, "a+b")
+        if os.fstat(self.file.fileno()).st_size < size:
+            with _lock_byte(self.file, size):
+                if os.fstat(self.file.fileno()).st_size < size:
+                    # New file is filled with zeros (empty slots)
+                    self.file.truncate(size)
+        self.memory = mmap.mmap(self.file.fileno(), size)
+
+    def get_token(
+        self, key: str, on_missing_token=None, *on_missing_token_args, **kwargs
+    ) -> str:
+        # Token might have been updated by another process
+        with self.forbid_concurrent_cache_access:
+            self._load_token(key)
+        return TokenMemoryCache.get_token(
+            self, key, on_missing_token, *on_missing_token_args, **kwargs
+        )
+
+    @contextlib.contextmanager
+    def _missing_token_lock(self, key: str):
+        # Threads of this process are serialized first as file locks are held per process
+        with TokenMemoryCache._missing_token_lock(self, key):
+            # Bytes after the slots are locked (different keys might share the same byte)
+            with _lock_byte(
+                self.file, self.slots * self.slot_size + 1 + zlib.crc32(key.encode())
+            ):
+                yield
+
+    def _clear(self):
+        with _lock_byte(self.file, self.slots * self.slot_size):
+            for index in range(self.slots):
+                if self._read_slot(index, writer_lock_held=True)[0] != bytes(64):
+                    self._write_slot(index, bytes(64), 0, b"", b"")
+
+    def _candidate_slots(self, digest: bytes) -> list:
+        start = int.from_bytes(digest[:8], "little") % self.slots
+        return [(start + probe) % self.slots for probe in range(self._probes)]
+
+    def _read_slot(self, index: int, writer_lock_held: bool = False) -> tuple:
+        """
+        :param writer_lock_held: The writer lock is held by the caller, no other process is writing.
+        :return: (digest, expiry, token, refresh token) as stored in the slot.
+        """
+        offset = index * self.slot_size
+        max_length = self.slot_size - self._slot_header.size
+        spins = 0
+        while True:
+            (
+                sequence,
+                digest,
+                expiry,
+                token_length,
+                refresh_length,
+            ) = self._slot_header.unpack_from(self.memory, offset)
+            if sequence % 2:
+                # Slot is being written
+                spins += 1
+                if writer_lock_held or spins >= self._spins:
+                    self._repair_slot(index, writer_lock_held)
+                    spins = 0
+                else:
+                    time.sleep(0)
+                continue
+            data_offset = offset + self._slot_header.size
+            token = self.memory[
+                data_offset : data_offset + min(token_length, max_length)
+            ]
+            data_offset += len(token)
+            refresh_token = self.memory[
+                data_offset : data_offset + min(refresh_length, max_length - len(token))
+            ]
+            if self._sequence.unpack_from(self.memory, offset)[0] == sequence:
+                return digest, expiry, token, refresh_token
+
+    def _repair_slot(self, index: int, writer_lock_held: bool):
+        """
+        Clear the slot if its writer was killed while writing it (sequence left odd once the writer lock is held).
+        :param writer_lock_held: The writer lock is held by the caller.
+        """
+        if not writer_lock_held:
+            # Wait for the writer to finish (if still alive)
+            with _lock_byte(self.file, self.slots * self.slot_size):
+                return self._repair_slot(index, writer_lock_held=True)
+        offset = index * self.slot_size
+        sequence = self._sequence.unpack_from(self.memory, offset)[0]
+        if sequence % 2:
+            logger.warning(
+                "Shared memory slot %d was left partially written, clearing it.", index
+            )
+            self._slot_header.pack_into(
+                self.memory, offset, sequence, bytes(64), 0, 0, 0
+            )
+            self._sequence.pack_into(self.memory, offset, sequence + 1)
+
+    def _write_slot(
+        self, index: int, digest: bytes, expiry: float, token: bytes, refresh: bytes
+    ):
+        """Must be called while holding the writer lock."""
+        offset = index * self.slot_size
+        sequence = self._sequence.unpack_from(self.memory, offset)[0]
+        # Readers will wait until slot is fully written
+        self._sequence.pack_into(self.memory, offset, sequence + 1)
+        data_offset = offset + self._slot_header.size
+        self.memory[data_offset : data_offset + len(token) + len(refresh)] = (
+            token + refresh
+        )
+        self._slot_header.pack_into(
+            self.memory, offset, sequence + 1, digest, expiry, len(token), len(refresh)
+        )
+        self._sequence.pack_into(self.memory, offset, sequence + 2)
+
+    def _save_token(self, key: str):
+        digest = hashlib.sha512(key.encode()).digest()
+        cached = self.tokens.get(key)
+        if cached:
+            token, expiry, *refresh_token = cached
+            token = token.encode()
+            refresh = refresh_token[0].encode() if refresh_token else b""
+            if len(token) + len(refresh) > self.slot_size - self._slot_header.size:
+                logger.warning(
+                    'Token with "%s" key is too large for shared memory, it is only cached in this process.',
+                    key,
+                )
+                # Previous token (if any) should not be used anymore
+                cached = None
+
+        # Single writer at a time (byte following the slots, next bytes being used by _missing_token_lock)
+        with _lock_byte(self.file, self.slots * self.slot_size):
+            candidates = [
+                (index, self._read_slot(index, writer_lock_held=True))
+                for index in self._candidate_slots(digest)
+            ]
+            for index, slot in candidates:
+                if slot[0] == digest:
+                    break
+            else:
+                if cached is None:
+                    return
+                # Replace an empty slot or the token expiring first
+                index = min(
+                    candidates,
+                    key=lambda candidate: (
+                        candidate[1][0] != bytes(64),
+                        candidate[1][1],
+                    ),
+                )[0]
+            if cached is None:
+                self._write_slot(index, bytes(64), 0, b"", b"")
+            else:
+                self._write_slot(index, digest, expiry, token, refresh)
+
+    def _load_token(self, key: str):
+        digest = hashlib.sha512(key.encode()).digest()
+        for index in self._candidate_slots(digest):
+            slot_digest, expiry, token, refresh_token = self._read_slot(index)
+            if slot_digest == digest:
+                stored = (token.decode(), expiry)
+                if refresh_token:
+                    stored += (refresh_token.decode(),)
+                # Token not found in shared memory (evicted or too large) is kept in this process
+                if self.tokens.get(key) != stored:
+                    self.tokens = {**self.tokens, key: stored}
+                return
@@ -47,6 +47,12 @@ setup(
         "requests==2.*"
     ],
     extras_require={
+        # Used by requests_auth.async_authentication
+        "async": ["httpx==0.*"],
+        # Used by requests_auth.instrumentation.PrometheusInstrumentation
+        "prometheus": ["prometheus_client==0.*"],
+        # Used by requests_auth.instrumentation.OpenTelemetryInstrumentation
+        "opentelemetry": ["opentelemetry-api==1.*"],
         "testing": [
             # Used to generate test tokens
             "pyjwt==1.*",
@@ -54,7 +60,13 @@ setup(
             "pytest-responses==0.4.*",
             # Used to check coverage
             "pytest-cov==2.*",
-        ]
+            # Used to test asynchronous authentication
+            "httpx==0.*",
+            "aiohttp==3.*",
+            # Used to test instrumentation
+            "prometheus_client==0.*",
+            "opentelemetry-sdk==1.*",
+        ],
     },
     python_requires=">=3.6",
     project_urls={
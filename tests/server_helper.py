@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List
+from urllib.parse import parse_qs
+
+import pytest
+
+
+class LocalServer:
+    """
+    Local stand-in for a token endpoint (POST /token) and a protected resource (GET /protected).
+    """
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(("localhost", 0), _Handler)
+        self.server.local_server = self
+        self.url = f"http://localhost:{self.server.server_address[1]}"
+        # Received token requests (body parameters)
+        self.token_requests: List[dict] = []
+        # Responses to token requests as (status, headers, json body, delay in seconds), last one is repeated
+        self.token_responses = [
+            (200, {}, {"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600}, 0)
+        ]
+        # Authorization header values rejected by the protected resource as invalid tokens
+        self.rejected_authorizations = set()
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def next_token_response(self, body: dict) -> tuple:
+        with self.lock:
+            self.token_requests.append(body)
+            if len(self.token_responses) > 1:
+                return self.token_responses.pop(0)
+            return self.token_responses[0]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        content_length = int(self.headers.get("Content-Length", 0))
+        body = parse_qs(self.rfile.read(content_length).decode())
+        status, headers, content, delay = self.server.local_server.next_token_response(
+            {name: values[0] for name, values in body.items()}
+        )
+        if delay:
+            time.sleep(delay)
+        self._send_json(status, content, headers)
+
+    def do_GET(self):
+        if (
+            self.headers.get("Authorization")
+            in self.server.local_server.rejected_authorizations
+        ):
+            self._send_json(
+                401,
+                {},
+                {"WWW-Authenticate": 'Bearer error="invalid_token"'},
+            )
+            return
+        self._send_json(
+            200,
+            {"path": self.path, "authorization": self.headers.get("Authorization")},
+        )
+
+    def _send_json(self, status: int, content: dict, headers: dict = None):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        pass
+
+
+@pytest.fixture
+def local_server() -> LocalServer:
+    server = LocalServer()
+    yield server
+    server.stop()
@@ -389,3 +389,24 @@ def test_oauth2_implicit_and_multiple_authentication_can_be_combined(
     tab.assert_success(
         "You are now authenticated on 42a85b271b7a652ca3cc4c398cfd3f01b9ad36bf9c945ba823b023e8f8b95c4638576a0e3dcc96838b838bec33ec6c0ee2609d62ed82480b3b8114ca494c0521. You may close this tab."
     )
+
+
+def test_changes_are_used_once_authentications_are_combined(
+    responses: RequestsMock,
+):
+    api_key_auth = requests_auth.HeaderApiKey("my_provided_api_key")
+    basic_auth = requests_auth.Basic("test_user", "test_pwd")
+    auth = api_key_auth + basic_auth
+    get_header(responses, auth)
+    api_key_auth.api_key = "my_provided_api_key2"
+    basic_auth.password = "test_pwd2"
+    header = get_header(responses, auth)
+    assert header.get("X-Api-Key") == "my_provided_api_key2"
+    assert header.get("Authorization") == "Basic dGVzdF91c2VyOnRlc3RfcHdkMg=="
+
+
+def test_last_static_authentication_wins_on_same_header(responses: RequestsMock):
+    api_key_auth = requests_auth.HeaderApiKey("my_provided_api_key")
+    api_key_auth2 = requests_auth.HeaderApiKey("my_provided_api_key2")
+    header = get_header(responses, api_key_auth + api_key_auth2)
+    assert header.get("X-Api-Key") == "my_provided_api_key2"
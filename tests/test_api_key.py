@@ -1,4 +1,5 @@
 import pytest
+import requests
 from responses import RequestsMock
 
 
@@ -36,3 +37,35 @@ def test_header_api_key_can_be_sent_in_a_custom_field_name(responses: RequestsMo
 def test_query_api_key_can_be_sent_in_a_custom_field_name(responses: RequestsMock):
     auth = requests_auth.QueryApiKey("my_provided_api_key", "X-API-QUERY-KEY")
     assert get_query_args(responses, auth) == "/?X-API-QUERY-KEY=my_provided_api_key"
+
+
+def test_query_api_key_can_be_appended(responses: RequestsMock):
+    auth = requests_auth.QueryApiKey("my_provided_api_key", fast_append=True)
+    assert get_query_args(responses, auth) == "/?api_key=my_provided_api_key"
+
+
+def test_appended_query_api_key_is_encoded():
+    auth = requests_auth.QueryApiKey("my provided&api_key", fast_append=True)
+    request = auth(requests.Request("GET", "http://authorized_only").prepare())
+    assert request.url == "http://authorized_only/?api_key=my+provided%26api_key"
+
+
+def test_appended_query_api_key_keeps_other_parameters_as_is():
+    auth = requests_auth.QueryApiKey("my_provided_api_key", fast_append=True)
+    request = requests.Request(
+        "GET", "http://authorized_only?b=2&a=%2F&c&api_key_id=3#fragment"
+    ).prepare()
+    assert (
+        auth(request).url
+        == "http://authorized_only/?b=2&a=%2F&c&api_key_id=3&api_key=my_provided_api_key#fragment"
+    )
+
+
+def test_appended_query_api_key_replaces_provided_one():
+    auth = requests_auth.QueryApiKey("my_provided_api_key", fast_append=True)
+    request = requests.Request(
+        "GET", "http://authorized_only?api_key=1&a=1&api_key=2"
+    ).prepare()
+    assert (
+        auth(request).url == "http://authorized_only/?a=1&api_key=my_provided_api_key"
+    )
@@ -10,3 +10,25 @@ def test_basic_authentication_send_authorization_header(responses: RequestsMock)
         get_header(responses, auth).get("Authorization")
         == "Basic dGVzdF91c2VyOnRlc3RfcHdk"
     )
+
+
+def test_basic_authentication_header_is_updated_with_password(
+    responses: RequestsMock,
+):
+    auth = requests_auth.Basic("test_user", "test_pwd")
+    get_header(responses, auth)
+    auth.password = "test_pwd2"
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Basic dGVzdF91c2VyOnRlc3RfcHdkMg=="
+    )
+
+
+def test_basic_authentication_with_bytes_and_latin1_credentials(
+    responses: RequestsMock,
+):
+    auth = requests_auth.Basic(b"test_user", "t\xe9st_pwd")
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Basic dGVzdF91c2VyOnTpc3RfcHdk"
+    )
@@ -0,0 +1,196 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+from responses import RequestsMock
+
+import requests_auth
+from requests_auth.broker import TokenBroker, BrokerTokenCache, GET, OK
+from tests.auth_helper import get_header
+
+if not hasattr(socket, "AF_UNIX"):
+    pytest.skip("Unix domain sockets are not available.", allow_module_level=True)
+
+
+@pytest.fixture
+def socket_path(tmp_path) -> str:
+    return str(tmp_path / "broker.sock")
+
+
+@pytest.fixture
+def auth() -> requests_auth.OAuth2ClientCredentials:
+    return requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token", client_id="test_user", client_secret="test_pwd"
+    )
+
+
+@pytest.fixture
+def broker(socket_path, auth):
+    _broker = TokenBroker(socket_path, auth)
+    thread = threading.Thread(target=_broker.serve_forever, daemon=True)
+    thread.start()
+    yield _broker
+    _broker.shutdown()
+    thread.join()
+
+
+def test_token_is_requested_once_by_broker(
+    broker, socket_path, auth, responses: RequestsMock
+):
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+    )
+    for _ in range(2):
+        token_cache = BrokerTokenCache(socket_path)
+        assert (
+            token_cache.get_token(auth.state, auth.request_new_token)
+            == "2YotnFZFEjr1zCsicMWpAA"
+        )
+        token_cache.clear()
+    assert len(responses.calls) == 1
+
+
+def test_broker_is_used_as_token_cache(
+    broker, socket_path, auth, responses: RequestsMock, monkeypatch
+):
+    monkeypatch.setattr(
+        requests_auth.OAuth2, "token_cache", BrokerTokenCache(socket_path)
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+    )
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Bearer 2YotnFZFEjr1zCsicMWpAA"
+    )
+    assert broker.token_cache.get_token(auth.state) == "2YotnFZFEjr1zCsicMWpAA"
+    requests_auth.OAuth2.token_cache.clear()
+
+
+def test_token_requested_by_client_is_shared(broker, socket_path):
+    token_cache = BrokerTokenCache(socket_path)
+    assert token_cache.get_token("key1", lambda: ("key1", "token1", 3600)) == "token1"
+
+    other_cache = BrokerTokenCache(socket_path)
+    assert other_cache.get_token("key1") == "token1"
+    token_cache.clear()
+    other_cache.clear()
+
+
+def test_invalidated_token_is_removed_from_broker(broker, socket_path):
+    token_cache = BrokerTokenCache(socket_path)
+    token_cache.add_access_token("key1", "token1", 3600)
+    assert token_cache.invalidate_token("key1", "token1")
+
+    other_cache = BrokerTokenCache(socket_path)
+    with pytest.raises(requests_auth.AuthenticationFailed):
+        other_cache.get_token("key1")
+    token_cache.clear()
+    other_cache.clear()
+
+
+def test_broker_failure_is_handled_by_client(
+    broker, socket_path, auth, responses: RequestsMock
+):
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"error": "temporarily_unavailable"},
+        status=400,
+    )
+    token_cache = BrokerTokenCache(socket_path)
+    assert (
+        token_cache.get_token(auth.state, lambda: (auth.state, "local_token", 3600))
+        == "local_token"
+    )
+    token_cache.clear()
+
+
+def test_token_is_requested_locally_if_broker_cannot_be_reached(socket_path):
+    token_cache = BrokerTokenCache(socket_path)
+    assert token_cache.get_token("key1", lambda: ("key1", "token1", 3600)) == "token1"
+    assert token_cache.get_token("key1") == "token1"
+
+
+def test_socket_is_only_accessible_by_current_user(broker, socket_path):
+    assert os.stat(socket_path).st_mode & 0o777 == 0o600
+
+
+def test_running_broker_is_not_replaced(broker, socket_path):
+    with pytest.raises(Exception) as exception_info:
+        TokenBroker(socket_path)
+    assert (
+        str(exception_info.value) == f"A broker is already listening on {socket_path}."
+    )
+    token_cache = BrokerTokenCache(socket_path)
+    token_cache.add_access_token("key1", "token1", 3600)
+    assert BrokerTokenCache(socket_path).get_token("key1") == "token1"
+    token_cache.clear()
+
+
+def test_socket_left_by_stopped_broker_is_replaced(socket_path):
+    # As if previous broker was killed
+    stopped = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stopped.bind(socket_path)
+    stopped.close()
+    broker = TokenBroker(socket_path)
+    thread = threading.Thread(target=broker.serve_forever, daemon=True)
+    thread.start()
+    token_cache = BrokerTokenCache(socket_path)
+    token_cache.add_access_token("key1", "token1", 3600)
+    assert BrokerTokenCache(socket_path).get_token("key1") == "token1"
+    broker.shutdown()
+    thread.join()
+
+
+def test_token_is_provided_with_its_own_expiry_when_replaced_concurrently(socket_path):
+    broker = TokenBroker(socket_path)
+    broker.token_cache.add_access_token("key1", "token1", 3600)
+    get_token = broker.token_cache.get_token
+
+    def get_token_then_evict(key, *args, **kwargs):
+        token = get_token(key, *args, **kwargs)
+        if token == "token1":
+            # Concurrent replacement
+            broker.token_cache.add_access_token(key, "token2", 3600)
+        return token
+
+    broker.token_cache.get_token = get_token_then_evict
+    status, expiry, token = broker.handle(GET, "key1", 0, "")
+    assert (status, token) == (OK, "token2")
+    assert expiry > time.time()
+    broker.server.server_close()
+    os.remove(socket_path)
+
+
+def test_pending_token_request_does_not_block_other_keys(socket_path):
+    released = threading.Event()
+
+    class SlowAuth:
+        state = "slow_key"
+
+        def request_new_token(self):
+            released.wait(timeout=5)
+            return "slow_key", "slow_token", 3600
+
+    slow_broker = TokenBroker(socket_path, SlowAuth())
+    threading.Thread(target=slow_broker.serve_forever, daemon=True).start()
+    token_cache = BrokerTokenCache(socket_path)
+    slow_request = threading.Thread(target=token_cache.get_token, args=("slow_key",))
+    slow_request.start()
+    try:
+        assert (
+            token_cache.get_token("key1", lambda: ("key1", "token1", 3600)) == "token1"
+        )
+        assert slow_request.is_alive()
+    finally:
+        released.set()
+        slow_request.join()
+        token_cache.clear()
+        slow_broker.shutdown()
@@ -0,0 +1,140 @@
+import time
+
+import pytest
+import requests
+from responses import RequestsMock
+
+import requests_auth
+from requests_auth.authentication import request_new_grant_with_post
+from requests_auth.oauth2_tokens import TokenMemoryCache
+from tests.server_helper import local_server, LocalServer
+from tests.auth_helper import get_header
+
+TOKEN = {"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600}
+
+
+@pytest.fixture
+def token_server(local_server: LocalServer, responses: RequestsMock) -> LocalServer:
+    # Token requests are sent to the local server
+    responses.add_passthru(local_server.url)
+    return local_server
+
+
+def request_token(token_server: LocalServer, circuit_breaker) -> tuple:
+    return request_new_grant_with_post(
+        f"{token_server.url}/token",
+        {"grant_type": "client_credentials"},
+        "access_token",
+        5,
+        circuit_breaker=circuit_breaker,
+    )
+
+
+def test_circuit_is_opened_after_consecutive_failures(token_server: LocalServer):
+    token_server.token_responses = [(503, {}, {}, 0)]
+    circuit_breaker = requests_auth.CircuitBreaker(failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(requests_auth.InvalidGrantRequest):
+            request_token(token_server, circuit_breaker)
+    url = f"{token_server.url}/token"
+    assert circuit_breaker.state(url) == "open"
+    assert circuit_breaker.states == {url: "open"}
+
+    with pytest.raises(requests_auth.CircuitBreakerOpen) as exception_info:
+        request_token(token_server, circuit_breaker)
+    assert (
+        str(exception_info.value)
+        == f"{url} is not requested after too many consecutive failures, retry later."
+    )
+    assert len(token_server.token_requests) == 2
+    assert circuit_breaker.rejected_requests == 1
+
+
+def test_success_resets_consecutive_failures(token_server: LocalServer):
+    token_server.token_responses = [
+        (503, {}, {}, 0),
+        (200, {}, TOKEN, 0),
+        (503, {}, {}, 0),
+    ]
+    circuit_breaker = requests_auth.CircuitBreaker(failure_threshold=2)
+    for _ in range(3):
+        try:
+            request_token(token_server, circuit_breaker)
+        except requests_auth.InvalidGrantRequest:
+            pass
+    assert circuit_breaker.state(f"{token_server.url}/token") == "closed"
+
+
+def test_invalid_request_is_not_a_failure(token_server: LocalServer):
+    token_server.token_responses = [(400, {}, {"error": "invalid_client"}, 0)]
+    circuit_breaker = requests_auth.CircuitBreaker(failure_threshold=1)
+    with pytest.raises(requests_auth.InvalidGrantRequest):
+        request_token(token_server, circuit_breaker)
+    assert circuit_breaker.state(f"{token_server.url}/token") == "closed"
+
+
+def test_single_request_is_sent_once_cool_down_is_over(token_server: LocalServer):
+    token_server.token_responses = [(503, {}, {}, 0), (200, {}, TOKEN, 0.2)]
+    circuit_breaker = requests_auth.CircuitBreaker(failure_threshold=1, cool_down=0.1)
+    with pytest.raises(requests_auth.InvalidGrantRequest):
+        request_token(token_server, circuit_breaker)
+    time.sleep(0.1)
+
+    url = f"{token_server.url}/token"
+    probing_states = []
+
+    def send_request():
+        probing_states.append(circuit_breaker.state(url))
+        # Other requests are rejected while probing
+        with pytest.raises(requests_auth.CircuitBreakerOpen):
+            circuit_breaker.send(url, lambda: None)
+        return requests_auth.OAuth2.session.post(url, data={}, timeout=5)
+
+    circuit_breaker.send(url, send_request)
+    assert probing_states == ["half-open"]
+    assert circuit_breaker.state(url) == "closed"
+
+
+def test_failed_probe_opens_circuit_again(token_server: LocalServer):
+    token_server.token_responses = [(503, {}, {}, 0)]
+    circuit_breaker = requests_auth.CircuitBreaker(failure_threshold=2, cool_down=0.1)
+    for _ in range(2):
+        with pytest.raises(requests_auth.InvalidGrantRequest):
+            request_token(token_server, circuit_breaker)
+    time.sleep(0.1)
+    with pytest.raises(requests_auth.InvalidGrantRequest):
+        request_token(token_server, circuit_breaker)
+    with pytest.raises(requests_auth.CircuitBreakerOpen):
+        request_token(token_server, circuit_breaker)
+    assert len(token_server.token_requests) == 3
+
+
+def test_stale_token_is_served_while_circuit_is_open(
+    token_server: LocalServer, responses: RequestsMock, monkeypatch
+):
+    token_cache = TokenMemoryCache(stale_token_grace_period=60)
+    monkeypatch.setattr(requests_auth.OAuth2, "token_cache", token_cache)
+    circuit_breaker = requests_auth.CircuitBreaker(failure_threshold=1)
+    monkeypatch.setattr(requests_auth.OAuth2, "circuit_breaker", circuit_breaker)
+    token_server.token_responses = [(503, {}, {}, 0)]
+    auth = requests_auth.OAuth2ClientCredentials(
+        f"{token_server.url}/token", client_id="test_user", client_secret="test_pwd"
+    )
+    with pytest.raises(requests_auth.InvalidGrantRequest):
+        auth(requests.Request("GET", "http://authorized_only").prepare())
+
+    token_cache.add_access_token(auth.state, "expired_token", -1)
+    assert get_header(responses, auth).get("Authorization") == "Bearer expired_token"
+    for _ in range(100):
+        if token_cache.background_refresh_failures:
+            break
+        time.sleep(0.01)
+    assert token_cache.background_refresh_failures == 1
+    assert circuit_breaker.rejected_requests == 1
+    token_cache.clear()
+
+
+def test_invalid_failure_threshold():
+    with pytest.raises(Exception) as exception_info:
+        requests_auth.CircuitBreaker(failure_threshold=0)
+    assert str(exception_info.value) == "failure_threshold must be a positive integer."
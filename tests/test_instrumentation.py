@@ -0,0 +1,246 @@
+import datetime
+
+import pytest
+import requests
+from responses import RequestsMock
+
+import requests_auth
+from requests_auth import instrumentation
+from requests_auth.oauth2_tokens import TokenMemoryCache
+from tests.oauth2_helper import token_cache, browser_mock, BrowserMock, create_token
+from tests.auth_helper import get_header
+
+
+class RecordingInstrumentation(instrumentation.Instrumentation):
+    def __init__(self):
+        self.measurements = []
+
+    def cache_hit(self, key: str):
+        self.measurements.append(("cache_hit", key))
+
+    def cache_miss(self, key: str):
+        self.measurements.append(("cache_miss", key))
+
+    def cache_eviction(self, key: str, reason: str):
+        self.measurements.append(("cache_eviction", key, reason))
+
+    def lock_wait(self, key: str, duration: float):
+        assert duration >= 0
+        self.measurements.append(("lock_wait", key))
+
+    def token_request(self, token_url: str, duration: float, error):
+        assert duration >= 0
+        self.measurements.append(("token_request", token_url, type(error)))
+
+    def browser_flow(self, grant_name: str, duration: float, error):
+        assert duration >= 0
+        self.measurements.append(("browser_flow", grant_name, type(error)))
+
+    def authentication(self, name: str, duration: float, error):
+        assert duration >= 0
+        self.measurements.append(("authentication", name, type(error)))
+
+
+@pytest.fixture
+def recording() -> RecordingInstrumentation:
+    recording = RecordingInstrumentation()
+    instrumentation.set_instrumentation(recording)
+    yield recording
+    instrumentation.set_instrumentation(None)
+
+
+def test_nothing_is_measured_by_default():
+    assert not instrumentation.enabled
+    assert type(instrumentation.active) is instrumentation.Instrumentation
+
+
+def test_client_credentials_flow_is_measured(
+    token_cache, responses: RequestsMock, recording: RecordingInstrumentation
+):
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token", client_id="test_user", client_secret="test_pwd"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+    )
+    get_header(responses, auth)
+    get_header(responses, auth)
+    assert recording.measurements == [
+        ("lock_wait", auth.state),
+        ("cache_miss", auth.state),
+        ("lock_wait", auth.state),
+        ("token_request", "http://provide_access_token", type(None)),
+        ("authentication", "OAuth2ClientCredentials", type(None)),
+        ("cache_hit", auth.state),
+        ("authentication", "OAuth2ClientCredentials", type(None)),
+    ]
+
+
+def test_token_request_failure_is_measured(
+    token_cache, responses: RequestsMock, recording: RecordingInstrumentation
+):
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token", client_id="test_user", client_secret="test_pwd"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"error": "invalid_client"},
+        status=400,
+    )
+    with pytest.raises(requests_auth.InvalidGrantRequest):
+        auth(requests.Request("GET", "http://authorized_only").prepare())
+    assert recording.measurements[-2:] == [
+        (
+            "token_request",
+            "http://provide_access_token",
+            requests_auth.InvalidGrantRequest,
+        ),
+        (
+            "authentication",
+            "OAuth2ClientCredentials",
+            requests_auth.InvalidGrantRequest,
+        ),
+    ]
+
+
+def test_browser_flow_is_measured(
+    token_cache,
+    responses: RequestsMock,
+    browser_mock: BrowserMock,
+    recording: RecordingInstrumentation,
+):
+    auth = requests_auth.OAuth2Implicit("http://provide_token")
+    expiry_in_1_hour = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    token = create_token(expiry_in_1_hour)
+    tab = browser_mock.add_response(
+        opened_url="http://provide_token?response_type=token&state=42a85b271b7a652ca3cc4c398cfd3f01b9ad36bf9c945ba823b023e8f8b95c4638576a0e3dcc96838b838bec33ec6c0ee2609d62ed82480b3b8114ca494c0521&redirect_uri=http%3A%2F%2Flocalhost%3A5000%2F",
+        reply_url=f"http://localhost:5000#access_token={token}&state=42a85b271b7a652ca3cc4c398cfd3f01b9ad36bf9c945ba823b023e8f8b95c4638576a0e3dcc96838b838bec33ec6c0ee2609d62ed82480b3b8114ca494c0521",
+    )
+    assert get_header(responses, auth).get("Authorization") == f"Bearer {token}"
+    assert ("browser_flow", "access_token", type(None)) in recording.measurements
+    assert recording.measurements[-1] == (
+        "authentication",
+        "OAuth2Implicit",
+        type(None),
+    )
+    tab.assert_success(
+        "You are now authenticated on 42a85b271b7a652ca3cc4c398cfd3f01b9ad36bf9c945ba823b023e8f8b95c4638576a0e3dcc96838b838bec33ec6c0ee2609d62ed82480b3b8114ca494c0521. You may close this tab."
+    )
+
+
+def test_cache_eviction_is_measured(recording: RecordingInstrumentation):
+    token_cache = TokenMemoryCache(max_size=1)
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.add_access_token("key2", "token2", 3600)
+    assert recording.measurements == [("cache_eviction", "key1", "size")]
+
+
+def test_prometheus_instrumentation(token_cache, responses: RequestsMock):
+    prometheus_client = pytest.importorskip("prometheus_client")
+    registry = prometheus_client.CollectorRegistry()
+    instrumentation.set_instrumentation(
+        instrumentation.PrometheusInstrumentation(registry=registry)
+    )
+    try:
+        auth = requests_auth.OAuth2ClientCredentials(
+            "http://provide_access_token",
+            client_id="test_user",
+            client_secret="test_pwd",
+        )
+        responses.add(
+            responses.POST,
+            "http://provide_access_token",
+            json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+        )
+        get_header(responses, auth)
+        get_header(responses, auth)
+    finally:
+        instrumentation.set_instrumentation(None)
+
+    def sample(name: str, **labels) -> float:
+        return registry.get_sample_value(f"requests_auth_{name}", labels)
+
+    assert sample("token_cache_requests_total", result="hit") == 1
+    assert sample("token_cache_requests_total", result="miss") == 1
+    assert (
+        sample(
+            "token_request_duration_seconds_count",
+            token_url="http://provide_access_token",
+            error="",
+        )
+        == 1
+    )
+    assert (
+        sample(
+            "authentication_duration_seconds_count",
+            authentication="OAuth2ClientCredentials",
+            error="",
+        )
+        == 2
+    )
+    assert sample("token_cache_lock_wait_seconds_count") == 2
+
+
+def test_opentelemetry_instrumentation(token_cache, responses: RequestsMock):
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    reader = InMemoryMetricReader()
+    exporter = InMemorySpanExporter()
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(exporter))
+    instrumentation.set_instrumentation(
+        instrumentation.OpenTelemetryInstrumentation(
+            meter=MeterProvider(metric_readers=[reader]).get_meter("test"),
+            tracer=tracer_provider.get_tracer("test"),
+        )
+    )
+    try:
+        auth = requests_auth.OAuth2ClientCredentials(
+            "http://provide_access_token",
+            client_id="test_user",
+            client_secret="test_pwd",
+        )
+        responses.add(
+            responses.POST,
+            "http://provide_access_token",
+            json={"error": "invalid_client"},
+            status=400,
+        )
+        with pytest.raises(requests_auth.InvalidGrantRequest):
+            auth(requests.Request("GET", "http://authorized_only").prepare())
+    finally:
+        instrumentation.set_instrumentation(None)
+
+    metrics = {
+        metric.name: [
+            (dict(point.attributes), getattr(point, "count", None) or point.value)
+            for point in metric.data.data_points
+        ]
+        for resource_metrics in reader.get_metrics_data().resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+    }
+    assert metrics["requests_auth.token_cache.requests"] == [({"result": "miss"}, 1)]
+    assert metrics["requests_auth.token_request.duration"] == [
+        (
+            {
+                "token_url": "http://provide_access_token",
+                "error": "InvalidGrantRequest",
+            },
+            1,
+        )
+    ]
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "requests_auth token request"
+    assert span.attributes["token_url"] == "http://provide_access_token"
+    assert not span.status.is_ok
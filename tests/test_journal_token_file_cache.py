@@ -0,0 +1,164 @@
+import datetime
+import json
+import multiprocessing
+import os
+
+import pytest
+import jwt
+
+import requests_auth
+
+
+@pytest.fixture(autouse=True)
+def lock_file(request):
+    yield
+    path = request.node.name + ".cache.lock"
+    if os.path.exists(path):
+        os.remove(path)
+
+
+@pytest.fixture
+def token_cache(request):
+    _token_cache = requests_auth.JournalTokenFileCache(request.node.name + ".cache")
+    yield _token_cache
+    _token_cache.clear()
+
+
+def create_token(expiry: datetime.datetime) -> str:
+    return jwt.encode({"exp": expiry}, "secret").decode("unicode_escape")
+
+
+def journal_lines(request) -> list:
+    with open(request.node.name + ".cache") as journal:
+        return [json.loads(line) for line in journal]
+
+
+def test_add_bearer_tokens(token_cache):
+    token1 = create_token(datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+    token_cache.add_bearer_token("key1", token1)
+    token2 = create_token(datetime.datetime.utcnow() + datetime.timedelta(hours=2))
+    token_cache.add_bearer_token("key2", token2)
+
+    assert token_cache.get_token("key1") == token1
+    assert token_cache.get_token("key2") == token2
+
+
+def test_tokens_are_appended(token_cache, request):
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.add_access_token("key2", "token2", 3600)
+    token_cache.add_access_token("key1", "token3", 3600)
+    assert [(key, cached[0]) for key, cached in journal_lines(request)] == [
+        ("key1", "token1"),
+        ("key2", "token2"),
+        ("key1", "token3"),
+    ]
+
+    same_cache = requests_auth.JournalTokenFileCache(request.node.name + ".cache")
+    assert same_cache.get_token("key1") == "token3"
+    assert same_cache.get_token("key2") == "token2"
+
+
+def test_removed_tokens_are_appended(token_cache, request):
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.invalidate_token("key1", "token1")
+    assert journal_lines(request)[-1] == ["key1", None]
+
+    same_cache = requests_auth.JournalTokenFileCache(request.node.name + ".cache")
+    assert "key1" not in same_cache.tokens
+
+
+def test_tokens_appended_by_another_cache_are_loaded(token_cache, request):
+    token_cache.add_access_token("key1", "token1", 3600)
+    other_cache = requests_auth.JournalTokenFileCache(request.node.name + ".cache")
+    other_cache.add_access_token("key2", "token2", 3600)
+    assert token_cache.get_token("key2") == "token2"
+    # Only new lines are read
+    assert token_cache.journal_lines == 2
+
+
+def test_journal_is_compacted(request):
+    token_cache = requests_auth.JournalTokenFileCache(
+        request.node.name + ".cache", compaction_threshold=4
+    )
+    for token in range(5):
+        token_cache.add_access_token("key1", f"token{token}", 3600)
+    token_cache.add_access_token("key2", "token5", 3600)
+    assert [(key, cached[0]) for key, cached in journal_lines(request)] == [
+        ("key1", "token4"),
+        ("key2", "token5"),
+    ]
+
+    same_cache = requests_auth.JournalTokenFileCache(request.node.name + ".cache")
+    assert same_cache.get_token("key1") == "token4"
+    assert same_cache.get_token("key2") == "token5"
+    token_cache.clear()
+
+
+def test_compacted_journal_is_reloaded_by_another_cache(request):
+    token_cache = requests_auth.JournalTokenFileCache(
+        request.node.name + ".cache", compaction_threshold=2
+    )
+    other_cache = requests_auth.JournalTokenFileCache(request.node.name + ".cache")
+    token_cache.add_access_token("key1", "token1", 3600)
+    assert other_cache.get_token("key1") == "token1"
+    token_cache.add_access_token("key1", "token2", 3600)
+    token_cache.add_access_token("key1", "token3", 3600)
+    assert other_cache.get_token("key1") == "token3"
+    assert other_cache.journal_lines == 1
+    token_cache.clear()
+
+
+def test_truncated_line_is_ignored(token_cache, request):
+    token_cache.add_access_token("key1", "token1", 3600)
+    with open(request.node.name + ".cache", "a") as journal:
+        journal.write('["key2", ["tok')
+
+    same_cache = requests_auth.JournalTokenFileCache(request.node.name + ".cache")
+    assert same_cache.get_token("key1") == "token1"
+    assert "key2" not in same_cache.tokens
+
+    # Following lines are not lost
+    same_cache.add_access_token("key3", "token3", 3600)
+    other_cache = requests_auth.JournalTokenFileCache(request.node.name + ".cache")
+    assert other_cache.get_token("key3") == "token3"
+
+
+def test_save_refresh_tokens(token_cache, request):
+    token_cache.add_access_token("key1", "token1", -1, refresh_token="refresh1")
+
+    same_cache = requests_auth.JournalTokenFileCache(request.node.name + ".cache")
+    assert same_cache.pop_refresh_token("key1") == "refresh1"
+    assert same_cache.pop_refresh_token("key1") is None
+
+
+def test_missing_token(token_cache):
+    with pytest.raises(requests_auth.AuthenticationFailed):
+        token_cache.get_token("key1")
+
+
+def save_tokens(tokens_path: str, key: str):
+    token_cache = requests_auth.JournalTokenFileCache(
+        tokens_path, compaction_threshold=5
+    )
+    for i in range(50):
+        token_cache.add_access_token(key, f"token{i}", 3600)
+
+
+def test_tokens_appended_by_other_processes_are_kept_on_compaction(request):
+    pytest.importorskip("fcntl")
+    tokens_path = request.node.name + ".cache"
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=save_tokens, args=(tokens_path, f"key{i}"))
+        for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    token_cache = requests_auth.JournalTokenFileCache(tokens_path)
+    assert {key: token_cache.get_token(key) for key in token_cache.tokens} == {
+        f"key{i}": "token49" for i in range(4)
+    }
+    token_cache.clear()
@@ -82,3 +82,62 @@ def test_missing_token_function(token_cache):
     token = jwt.encode({"exp": expiry_in_1_hour}, "secret").decode("unicode_escape")
     retrieved_token = token_cache.get_token("key1", lambda: ("key1", token))
     assert retrieved_token == token
+
+
+def test_save_refresh_tokens(token_cache, request):
+    token_cache.add_access_token("key1", "token1", -1, refresh_token="refresh1")
+
+    same_cache = requests_auth.JsonTokenFileCache(request.node.name + ".cache")
+    assert same_cache.pop_refresh_token("key1") == "refresh1"
+    assert same_cache.pop_refresh_token("key1") is None
+
+
+def test_cache_file_is_checked_on_every_retrieval_by_default(token_cache, monkeypatch):
+    token_cache.add_access_token("key1", "token1", 3600)
+    checks = []
+    getmtime = requests_auth.oauth2_tokens.os.path.getmtime
+    monkeypatch.setattr(
+        requests_auth.oauth2_tokens.os.path,
+        "getmtime",
+        lambda path: checks.append(path) or getmtime(path),
+    )
+    for _ in range(3):
+        token_cache.get_token("key1")
+    assert len(checks) == 3
+
+
+def test_cache_file_is_checked_once_per_revalidation_interval(request, monkeypatch):
+    token_cache = requests_auth.JsonTokenFileCache(
+        request.node.name + ".cache", revalidation_interval=60
+    )
+    token_cache.add_access_token("key1", "token1", 3600)
+    checks = []
+    getmtime = requests_auth.oauth2_tokens.os.path.getmtime
+    monkeypatch.setattr(
+        requests_auth.oauth2_tokens.os.path,
+        "getmtime",
+        lambda path: checks.append(path) or getmtime(path),
+    )
+    for _ in range(3):
+        token_cache.get_token("key1")
+    assert len(checks) == 1
+    token_cache.clear()
+
+
+def test_tokens_saved_by_another_cache_are_loaded_after_revalidation_interval(
+    request,
+):
+    token_cache = requests_auth.JsonTokenFileCache(
+        request.node.name + ".cache", revalidation_interval=60
+    )
+    token_cache.add_access_token("key1", "token1", 3600)
+    assert token_cache.get_token("key1") == "token1"
+
+    other_cache = requests_auth.JsonTokenFileCache(request.node.name + ".cache")
+    other_cache.add_access_token("key1", "token2", 3600)
+    assert token_cache.get_token("key1") == "token1"
+
+    # Simulate the end of revalidation interval
+    token_cache.next_revalidation = 0
+    assert token_cache.get_token("key1") == "token2"
+    token_cache.clear()
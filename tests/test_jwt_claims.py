@@ -0,0 +1,70 @@
+import datetime
+
+import jwt
+import pytest
+
+import requests_auth
+from requests_auth import jwt_claims, oauth2_tokens
+
+
+def create_token(claims: dict, secret: str = "secret") -> str:
+    return jwt.encode(claims, secret).decode("unicode_escape")
+
+
+def test_claims_are_decoded():
+    expiry = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)
+    claims = jwt_claims.decode_claims(
+        create_token({"exp": expiry, "nbf": 10, "iat": 5, "scope": "read write"})
+    )
+    assert claims.expiry == expiry.timestamp()
+    assert claims.not_before == 10
+    assert claims.issued_at == 5
+    assert claims.scopes == {"read", "write"}
+
+
+def test_non_ascii_claims_are_decoded():
+    claims = jwt_claims.decode_claims(create_token({"exp": 10, "name": "Zoë 名前"}))
+    assert claims.values["name"] == "Zoë 名前"
+
+
+def test_scp_claim_is_used_as_scopes():
+    assert jwt_claims.decode_claims(
+        create_token({"scp": ["read", "write"]})
+    ).scopes == {"read", "write"}
+    assert jwt_claims.decode_claims(create_token({})).scopes == set()
+
+
+def test_claims_are_decoded_once_per_token():
+    token = create_token({"exp": 10, "sub": "memoized"})
+    assert jwt_claims.decode_claims(token) is jwt_claims.decode_claims(token)
+
+
+def test_claims_are_not_shared_by_tokens_with_the_same_signature():
+    token = create_token({"exp": 10})
+    header, _, signature = token.split(".")
+    other_body = create_token({"exp": 20}).split(".")[1]
+    jwt_claims.decode_claims(token)
+    assert jwt_claims.decode_claims(f"{header}.{other_body}.{signature}").expiry == 20
+
+
+def test_number_of_memoized_claims_is_bounded(monkeypatch):
+    monkeypatch.setattr(jwt_claims, "MEMO_SIZE", 2)
+    monkeypatch.setattr(jwt_claims, "_memo", {})
+    tokens = [create_token({"exp": expiry}) for expiry in range(3)]
+    for token in tokens:
+        jwt_claims.decode_claims(token)
+    assert [memoized[1].expiry for memoized in jwt_claims._memo.values()] == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "token", ["not a token", "header.!!!.signature", "header.WzFd.signature"]
+)
+def test_invalid_token(token):
+    with pytest.raises(requests_auth.InvalidToken) as exception_info:
+        jwt_claims.decode_claims(token)
+    assert str(exception_info.value) == "JSON Web Token is invalid."
+
+
+def test_decode_base64_is_deprecated():
+    with pytest.warns(DeprecationWarning):
+        assert oauth2_tokens.decode_base64("eyJleHAiOjF9") == '{"exp":1}'
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import requests_auth
+
+pytest.importorskip("fcntl")
+
+
+@pytest.fixture
+def tokens_path(request):
+    path = request.node.name + ".cache"
+    yield path
+    requests_auth.MultiprocessJsonTokenFileCache(path).clear()
+    os.remove(f"{path}.lock")
+
+
+def request_token_once(
+    tokens_path: str, calls_path: str, results, revalidation_interval
+):
+    token_cache = requests_auth.MultiprocessJsonTokenFileCache(
+        tokens_path, revalidation_interval=revalidation_interval
+    )
+
+    def request_new_token():
+        with open(calls_path, "a") as calls:
+            calls.write(f"{os.getpid()}\n")
+        time.sleep(0.2)
+        return "key1", f"token from {os.getpid()}", 3600
+
+    results.put(token_cache.get_token("key1", request_new_token))
+
+
+def save_token(tokens_path: str, key: str):
+    token_cache = requests_auth.MultiprocessJsonTokenFileCache(tokens_path)
+    for i in range(20):
+        token_cache.add_access_token(key, f"token{i}", 3600)
+
+
+@pytest.mark.parametrize("revalidation_interval", [None, 60])
+def test_token_is_requested_by_a_single_process(
+    tokens_path, request, revalidation_interval
+):
+    calls_path = request.node.name + ".calls"
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=request_token_once,
+            args=(tokens_path, calls_path, results, revalidation_interval),
+        )
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    tokens = [results.get(timeout=10) for _ in processes]
+    for process in processes:
+        process.join()
+
+    with open(calls_path) as calls:
+        callers = calls.read().split()
+    os.remove(calls_path)
+    assert len(callers) == 1
+    assert tokens == [f"token from {callers[0]}"] * 4
+
+
+def test_tokens_saved_by_other_processes_are_kept(tokens_path):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=save_token, args=(tokens_path, f"key{i}"))
+        for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    token_cache = requests_auth.MultiprocessJsonTokenFileCache(tokens_path)
+    assert {key: token_cache.get_token(key) for key in token_cache.tokens} == {
+        f"key{i}": "token19" for i in range(4)
+    }
+
+
+def test_tokens_are_loaded_once_modified(tokens_path):
+    token_cache = requests_auth.MultiprocessJsonTokenFileCache(tokens_path)
+    other_cache = requests_auth.MultiprocessJsonTokenFileCache(tokens_path)
+    token_cache.add_access_token("key1", "token1", 3600)
+    assert other_cache.get_token("key1") == "token1"
+    token_cache.add_access_token("key1", "token2", 3600)
+    assert other_cache.get_token("key1") == "token2"
+
+
+def test_save_refresh_tokens(tokens_path):
+    token_cache = requests_auth.MultiprocessJsonTokenFileCache(tokens_path)
+    token_cache.add_access_token("key1", "token1", -1, refresh_token="refresh1")
+
+    same_cache = requests_auth.MultiprocessJsonTokenFileCache(tokens_path)
+    assert same_cache.pop_refresh_token("key1") == "refresh1"
+    assert same_cache.pop_refresh_token("key1") is None
@@ -678,3 +678,119 @@ def test_header_value_must_contains_token():
             "http://test_url", "http://test_url", header_value="Bearer token"
         )
     assert str(exception_info.value) == "header_value parameter must contains {token}."
+
+
+def test_refresh_token_is_used_when_token_is_expired(
+    token_cache, responses: RequestsMock, browser_mock: BrowserMock
+):
+    auth = requests_auth.OAuth2AuthorizationCode(
+        "http://provide_code", "http://provide_access_token"
+    )
+    token_cache.add_access_token(
+        auth.state, "expired_token", -1, refresh_token="tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+    )
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Bearer 2YotnFZFEjr1zCsicMWpAA"
+    )
+    assert (
+        get_request(responses, "http://provide_access_token/").body
+        == "grant_type=refresh_token&response_type=code&refresh_token=tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+    # Refresh token is kept as no new one was issued
+    assert token_cache.tokens[auth.state][2] == "tGzv3JOkF0XG5Qx2TlKWIA"
+
+
+def test_refresh_token_is_kept_when_token_request_fails(
+    token_cache, responses: RequestsMock, browser_mock: BrowserMock
+):
+    auth = requests_auth.OAuth2AuthorizationCode(
+        "http://provide_code", "http://provide_access_token"
+    )
+    token_cache.add_access_token(
+        auth.state, "expired_token", -1, refresh_token="tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        body=requests.ConnectionError("Server unreachable"),
+    )
+    with pytest.raises(requests.ConnectionError):
+        requests.get("http://authorized_only", auth=auth)
+    assert token_cache.tokens[auth.state][2] == "tGzv3JOkF0XG5Qx2TlKWIA"
+
+
+def test_new_refresh_token_is_stored(
+    token_cache, responses: RequestsMock, browser_mock: BrowserMock
+):
+    auth = requests_auth.OAuth2AuthorizationCode(
+        "http://provide_code", "http://provide_access_token"
+    )
+    token_cache.add_access_token(
+        auth.state, "expired_token", -1, refresh_token="tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={
+            "access_token": "2YotnFZFEjr1zCsicMWpAA",
+            "expires_in": 3600,
+            "refresh_token": "new_refresh_token",
+        },
+    )
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Bearer 2YotnFZFEjr1zCsicMWpAA"
+    )
+    assert token_cache.tokens[auth.state][2] == "new_refresh_token"
+
+
+def test_browser_is_used_when_refresh_token_is_invalid(
+    token_cache, responses: RequestsMock, browser_mock: BrowserMock
+):
+    auth = requests_auth.OAuth2AuthorizationCode(
+        "http://provide_code", "http://provide_access_token"
+    )
+    token_cache.add_access_token(
+        auth.state, "expired_token", -1, refresh_token="tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+    tab = browser_mock.add_response(
+        opened_url="http://provide_code?response_type=code&state=163f0455b3e9cad3ca04254e5a0169553100d3aa0756c7964d897da316a695ffed5b4f46ef305094fd0a88cfe4b55ff257652015e4aa8f87b97513dba440f8de&redirect_uri=http%3A%2F%2Flocalhost%3A5000%2F",
+        reply_url="http://localhost:5000#code=SplxlOBeZQQYbYS6WxSbIA&state=163f0455b3e9cad3ca04254e5a0169553100d3aa0756c7964d897da316a695ffed5b4f46ef305094fd0a88cfe4b55ff257652015e4aa8f87b97513dba440f8de",
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"error": "invalid_grant"},
+        status=400,
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={
+            "access_token": "2YotnFZFEjr1zCsicMWpAA",
+            "expires_in": 3600,
+            "refresh_token": "new_refresh_token",
+        },
+    )
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Bearer 2YotnFZFEjr1zCsicMWpAA"
+    )
+    assert (
+        get_request(responses, "http://provide_access_token/").body
+        == "grant_type=refresh_token&response_type=code&refresh_token=tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+    assert (
+        get_request(responses, "http://provide_access_token/").body
+        == "grant_type=authorization_code&redirect_uri=http%3A%2F%2Flocalhost%3A5000%2F&response_type=code&code=SplxlOBeZQQYbYS6WxSbIA"
+    )
+    tab.assert_success(
+        "You are now authenticated on 163f0455b3e9cad3ca04254e5a0169553100d3aa0756c7964d897da316a695ffed5b4f46ef305094fd0a88cfe4b55ff257652015e4aa8f87b97513dba440f8de. You may close this tab."
+    )
+    assert token_cache.tokens[auth.state][2] == "new_refresh_token"
@@ -670,3 +670,70 @@ def test_header_value_must_contains_token():
             "http://test_url", "http://test_url", header_value="Bearer token"
         )
     assert str(exception_info.value) == "header_value parameter must contains {token}."
+
+
+def test_refresh_token_is_used_when_token_is_expired(
+    token_cache, responses: RequestsMock, monkeypatch, browser_mock: BrowserMock
+):
+    monkeypatch.setattr(requests_auth.authentication.os, "urandom", lambda x: b"1" * 63)
+    auth = requests_auth.OAuth2AuthorizationCodePKCE(
+        "http://provide_code", "http://provide_access_token", client_id="test_client"
+    )
+    token_cache.add_access_token(
+        auth.state, "expired_token", -1, refresh_token="tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+    )
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Bearer 2YotnFZFEjr1zCsicMWpAA"
+    )
+    assert (
+        get_request(responses, "http://provide_access_token/").body
+        == "grant_type=refresh_token&client_id=test_client&response_type=code&refresh_token=tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+
+
+def test_browser_is_used_when_refresh_token_is_invalid(
+    token_cache, responses: RequestsMock, monkeypatch, browser_mock: BrowserMock
+):
+    monkeypatch.setattr(requests_auth.authentication.os, "urandom", lambda x: b"1" * 63)
+    auth = requests_auth.OAuth2AuthorizationCodePKCE(
+        "http://provide_code", "http://provide_access_token"
+    )
+    token_cache.add_access_token(
+        auth.state, "expired_token", -1, refresh_token="tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+    tab = browser_mock.add_response(
+        opened_url="http://provide_code?response_type=code&state=163f0455b3e9cad3ca04254e5a0169553100d3aa0756c7964d897da316a695ffed5b4f46ef305094fd0a88cfe4b55ff257652015e4aa8f87b97513dba440f8de&redirect_uri=http%3A%2F%2Flocalhost%3A5000%2F&code_challenge=5C_ph_KZ3DstYUc965SiqmKAA-ShvKF4Ut7daKd3fjc&code_challenge_method=S256",
+        reply_url="http://localhost:5000#code=SplxlOBeZQQYbYS6WxSbIA&state=163f0455b3e9cad3ca04254e5a0169553100d3aa0756c7964d897da316a695ffed5b4f46ef305094fd0a88cfe4b55ff257652015e4aa8f87b97513dba440f8de",
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"error": "invalid_grant"},
+        status=400,
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+    )
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Bearer 2YotnFZFEjr1zCsicMWpAA"
+    )
+    assert (
+        get_request(responses, "http://provide_access_token/").body
+        == "grant_type=refresh_token&response_type=code&refresh_token=tGzv3JOkF0XG5Qx2TlKWIA"
+    )
+    assert (
+        get_request(responses, "http://provide_access_token/").body
+        == "code_verifier=MTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTExMTEx&grant_type=authorization_code&redirect_uri=http%3A%2F%2Flocalhost%3A5000%2F&response_type=code&code=SplxlOBeZQQYbYS6WxSbIA"
+    )
+    tab.assert_success(
+        "You are now authenticated on 163f0455b3e9cad3ca04254e5a0169553100d3aa0756c7964d897da316a695ffed5b4f46ef305094fd0a88cfe4b55ff257652015e4aa8f87b97513dba440f8de. You may close this tab."
+    )
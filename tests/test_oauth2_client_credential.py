@@ -1,3 +1,6 @@
+import io
+import time
+
 from responses import RequestsMock
 import pytest
 import requests
@@ -283,3 +286,264 @@ def test_header_value_must_contains_token():
             "http://test_url", "test_user", "test_pwd", header_value="Bearer token"
         )
     assert str(exception_info.value) == "header_value parameter must contains {token}."
+
+
+def test_token_is_refreshed_in_background_before_expiry(
+    monkeypatch, responses: RequestsMock
+):
+    token_cache = requests_auth.TokenMemoryCache(early_refresh_ratio=0.9)
+    monkeypatch.setattr(requests_auth.OAuth2, "token_cache", token_cache)
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token", client_id="test_user", client_secret="test_pwd"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "first_token", "expires_in": 1},
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "second_token", "expires_in": 3600},
+    )
+    assert get_header(responses, auth).get("Authorization") == "Bearer first_token"
+    for _ in range(100):
+        if token_cache.tokens[auth.state][0] == "second_token":
+            break
+        time.sleep(0.01)
+    assert get_header(responses, auth).get("Authorization") == "Bearer second_token"
+    token_cache.clear()
+
+
+def test_rejected_token_is_replaced_and_request_is_sent_again(
+    token_cache, responses: RequestsMock
+):
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token",
+        client_id="test_user",
+        client_secret="test_pwd",
+        retry_on_invalid_token=True,
+    )
+    token_cache.add_access_token(auth.state, "revoked_token", 3600)
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "new_token", "expires_in": 3600},
+    )
+    responses.add(
+        responses.GET,
+        "http://authorized_only",
+        status=401,
+        headers={
+            "WWW-Authenticate": 'Bearer realm="example", error="invalid_token", error_description="The access token was revoked"'
+        },
+    )
+    responses.add(responses.GET, "http://authorized_only")
+
+    response = requests.get("http://authorized_only", auth=auth)
+    assert response.status_code == 200
+    assert response.request.headers["Authorization"] == "Bearer new_token"
+    assert [previous.status_code for previous in response.history] == [401]
+    assert token_cache.get_token(auth.state) == "new_token"
+
+
+class RejectingAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter rejecting revoked_token and recording received bodies (bypassing responses mock)."""
+
+    def __init__(self):
+        super().__init__()
+        self.received = []
+
+    def send(self, request, **kwargs):
+        body = request.body.read() if hasattr(request.body, "read") else request.body
+        if not isinstance(body, (str, bytes, type(None))):
+            body = b"".join(body)
+        self.received.append((request.headers["Authorization"], body))
+        response = requests.Response()
+        response.request = request
+        response.connection = self
+        response._content = b""
+        if request.headers["Authorization"] == "Bearer revoked_token":
+            response.status_code = 401
+            response.headers["WWW-Authenticate"] = 'Bearer error="invalid_token"'
+        else:
+            response.status_code = 200
+        return response
+
+    def close(self):
+        pass
+
+
+def send_with_rejected_token(token_cache, body):
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token",
+        client_id="test_user",
+        client_secret="test_pwd",
+        retry_on_invalid_token=True,
+    )
+    token_cache.add_access_token(auth.state, "revoked_token", 3600)
+    adapter = RejectingAdapter()
+    with requests.Session() as session:
+        session.mount("http://authorized_only", adapter)
+        response = session.put("http://authorized_only", data=body, auth=auth)
+    return response, adapter.received
+
+
+def test_file_body_is_sent_again_with_new_token(token_cache, responses: RequestsMock):
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "new_token", "expires_in": 3600},
+    )
+    body = io.BytesIO(b"skipped content")
+    body.seek(8)
+    response, received = send_with_rejected_token(token_cache, body)
+    assert response.status_code == 200
+    assert received == [
+        ("Bearer revoked_token", b"content"),
+        ("Bearer new_token", b"content"),
+    ]
+
+
+def test_streamed_body_is_not_sent_again(token_cache):
+    body = (chunk for chunk in [b"content"])
+    response, received = send_with_rejected_token(token_cache, body)
+    assert response.status_code == 401
+    assert received == [("Bearer revoked_token", b"content")]
+
+
+def test_rejected_token_is_sent_again_only_once(token_cache, responses: RequestsMock):
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token",
+        client_id="test_user",
+        client_secret="test_pwd",
+        retry_on_invalid_token=True,
+    )
+    token_cache.add_access_token(auth.state, "revoked_token", 3600)
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "new_token", "expires_in": 3600},
+    )
+    responses.add(
+        responses.GET,
+        "http://authorized_only",
+        status=401,
+        headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+    )
+
+    response = requests.get("http://authorized_only", auth=auth)
+    assert response.status_code == 401
+    assert response.request.headers["Authorization"] == "Bearer new_token"
+    assert len(response.history) == 1
+
+
+def test_token_is_kept_if_not_rejected_as_invalid(token_cache, responses: RequestsMock):
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token",
+        client_id="test_user",
+        client_secret="test_pwd",
+        retry_on_invalid_token=True,
+    )
+    token_cache.add_access_token(auth.state, "valid_token", 3600)
+    responses.add(
+        responses.GET,
+        "http://authorized_only",
+        status=401,
+        headers={"WWW-Authenticate": 'Bearer error="insufficient_scope"'},
+    )
+
+    response = requests.get("http://authorized_only", auth=auth)
+    assert response.status_code == 401
+    assert not response.history
+    assert token_cache.get_token(auth.state) == "valid_token"
+
+
+def test_rejected_token_is_not_replaced_by_default(
+    token_cache, responses: RequestsMock
+):
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token", client_id="test_user", client_secret="test_pwd"
+    )
+    token_cache.add_access_token(auth.state, "revoked_token", 3600)
+    responses.add(
+        responses.GET,
+        "http://authorized_only",
+        status=401,
+        headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+    )
+
+    response = requests.get("http://authorized_only", auth=auth)
+    assert response.status_code == 401
+    assert token_cache.get_token(auth.state) == "revoked_token"
+
+
+def test_header_value_is_formatted_once_per_token(token_cache):
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token",
+        client_id="test_user",
+        client_secret="test_pwd",
+        header_value="JWT {token}",
+    )
+    token_cache.add_access_token(auth.state, "token1", 3600)
+    first = auth(requests.Request("GET", "http://authorized_only").prepare())
+    second = auth(requests.Request("GET", "http://authorized_only").prepare())
+    assert first.headers["Authorization"] == "JWT token1"
+    assert first.headers["Authorization"] is second.headers["Authorization"]
+
+    token_cache.add_access_token(auth.state, "token2", 3600)
+    third = auth(requests.Request("GET", "http://authorized_only").prepare())
+    assert third.headers["Authorization"] == "JWT token2"
+
+
+def test_missing_tokens_are_requested_on_warm_up(token_cache, responses: RequestsMock):
+    auth1 = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token", client_id="test_user", client_secret="test_pwd"
+    )
+    auth2 = requests_auth.OAuth2ResourceOwnerPasswordCredentials(
+        "http://provide_access_token2", username="test_user", password="test_pwd"
+    )
+    api_key_auth = requests_auth.HeaderApiKey("my_provided_api_key")
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "token1", "expires_in": 3600},
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token2",
+        json={"access_token": "token2", "expires_in": 3600},
+    )
+    results = requests_auth.warm_up(auth1, api_key_auth + auth2, api_key_auth)
+    assert [(auth, error) for auth, _, error in results] == [
+        (auth1, None),
+        (auth2, None),
+    ]
+    assert all(duration >= 0 for _, duration, _ in results)
+    assert len(responses.calls) == 2
+    assert get_header(responses, auth1 + auth2).get("Authorization") == "Bearer token2"
+    assert len(responses.calls) == 3
+
+
+def test_warm_up_failures_are_reported(token_cache, responses: RequestsMock):
+    auth1 = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token", client_id="test_user", client_secret="test_pwd"
+    )
+    auth2 = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token2", client_id="test_user", client_secret="test_pwd"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "token1", "expires_in": 3600},
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token2",
+        json={"error": "invalid_client"},
+        status=400,
+    )
+    (_, _, error1), (_, _, error2) = requests_auth.warm_up(auth1, auth2, max_workers=1)
+    assert error1 is None
+    assert isinstance(error2, requests_auth.InvalidGrantRequest)
+    assert token_cache.get_token(auth1.state) == "token1"
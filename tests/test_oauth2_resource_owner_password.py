@@ -1,3 +1,5 @@
+import time
+
 from responses import RequestsMock
 import pytest
 import requests
@@ -377,3 +379,30 @@ def test_header_value_must_contains_token():
             "http://test_url", "test_user", "test_pwd", header_value="Bearer token"
         )
     assert str(exception_info.value) == "header_value parameter must contains {token}."
+
+
+def test_token_is_refreshed_in_background_before_expiry(
+    monkeypatch, responses: RequestsMock
+):
+    token_cache = requests_auth.TokenMemoryCache(early_refresh_ratio=0.9)
+    monkeypatch.setattr(requests_auth.OAuth2, "token_cache", token_cache)
+    auth = requests_auth.OAuth2ResourceOwnerPasswordCredentials(
+        "http://provide_access_token", username="test_user", password="test_pwd"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "first_token", "expires_in": 1},
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "second_token", "expires_in": 3600},
+    )
+    assert get_header(responses, auth).get("Authorization") == "Bearer first_token"
+    for _ in range(100):
+        if token_cache.tokens[auth.state][0] == "second_token":
+            break
+        time.sleep(0.01)
+    assert get_header(responses, auth).get("Authorization") == "Bearer second_token"
+    token_cache.clear()
@@ -0,0 +1,147 @@
+import pytest
+import requests
+from responses import RequestsMock
+
+import requests_auth
+import requests_auth.authentication
+from requests_auth.authentication import request_new_grant_with_post
+from tests.oauth2_helper import token_cache
+from tests.server_helper import local_server, LocalServer
+from tests.auth_helper import get_header
+
+TOKEN = {"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600}
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list:
+    delays = []
+    monkeypatch.setattr(requests_auth.authentication.time, "sleep", delays.append)
+    return delays
+
+
+@pytest.fixture
+def token_server(local_server: LocalServer, responses: RequestsMock) -> LocalServer:
+    # Token requests are sent to the local server
+    responses.add_passthru(local_server.url)
+    return local_server
+
+
+def request_token(token_server: LocalServer, retry_policy) -> tuple:
+    return request_new_grant_with_post(
+        f"{token_server.url}/token",
+        {"grant_type": "client_credentials"},
+        "access_token",
+        5,
+        retry_policy=retry_policy,
+    )
+
+
+def test_temporary_failure_is_retried_with_jitter(token_server: LocalServer, sleeps):
+    token_server.token_responses = [
+        (503, {}, {}, 0),
+        (502, {}, {}, 0),
+        (200, {}, TOKEN, 0),
+    ]
+    retry_policy = requests_auth.RetryPolicy(backoff=0.5)
+    assert request_token(token_server, retry_policy) == (
+        "2YotnFZFEjr1zCsicMWpAA",
+        3600,
+        None,
+    )
+    assert len(token_server.token_requests) == 3
+    assert 0 <= sleeps[0] <= 0.5
+    assert 0 <= sleeps[1] <= 1
+    assert retry_policy.retries == 2
+
+
+def test_retry_after_is_honored(token_server: LocalServer, sleeps):
+    token_server.token_responses = [
+        (429, {"Retry-After": "2"}, {}, 0),
+        (200, {}, TOKEN, 0),
+    ]
+    request_token(token_server, requests_auth.RetryPolicy())
+    assert sleeps == [2]
+
+
+def test_retry_after_above_max_delay_is_not_retried(token_server: LocalServer, sleeps):
+    token_server.token_responses = [
+        (503, {"Retry-After": "120"}, {"error": "temporarily_unavailable"}, 0),
+        (200, {}, TOKEN, 0),
+    ]
+    with pytest.raises(requests_auth.InvalidGrantRequest):
+        request_token(token_server, requests_auth.RetryPolicy(max_delay=30))
+    assert len(token_server.token_requests) == 1
+    assert sleeps == []
+
+
+def test_failure_is_raised_once_attempts_are_exhausted(
+    token_server: LocalServer, sleeps
+):
+    token_server.token_responses = [(503, {}, {"error": "temporarily_unavailable"}, 0)]
+    with pytest.raises(requests_auth.InvalidGrantRequest) as exception_info:
+        request_token(token_server, requests_auth.RetryPolicy(max_attempts=2))
+    assert str(exception_info.value).startswith("temporarily_unavailable")
+    assert len(token_server.token_requests) == 2
+    assert len(sleeps) == 1
+
+
+def test_invalid_request_is_not_retried(token_server: LocalServer, sleeps):
+    token_server.token_responses = [(400, {}, {"error": "invalid_client"}, 0)]
+    with pytest.raises(requests_auth.InvalidGrantRequest):
+        request_token(token_server, requests_auth.RetryPolicy())
+    assert len(token_server.token_requests) == 1
+
+
+def test_retries_are_limited_by_budget(token_server: LocalServer, sleeps):
+    token_server.token_responses = [(503, {}, {}, 0)]
+    retry_policy = requests_auth.RetryPolicy(max_budget=1.5, budget_ratio=0.5)
+    for _ in range(2):
+        with pytest.raises(requests_auth.InvalidGrantRequest):
+            request_token(token_server, retry_policy)
+    # First request retried once (budget 1.5 -> 0.5), second one is retried once (budget 0.5 + 0.5 -> 0)
+    assert len(token_server.token_requests) == 4
+    assert retry_policy.retries == 2
+    assert retry_policy.denied_retries == 2
+
+
+def test_connection_error_is_retried(responses: RequestsMock, sleeps):
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        body=requests.ConnectionError("Connection refused"),
+    )
+    responses.add(responses.POST, "http://provide_access_token", json=TOKEN)
+    assert (
+        request_new_grant_with_post(
+            "http://provide_access_token",
+            {},
+            "access_token",
+            5,
+            retry_policy=requests_auth.RetryPolicy(),
+        )[0]
+        == "2YotnFZFEjr1zCsicMWpAA"
+    )
+    assert len(sleeps) == 1
+
+
+def test_default_retry_policy_is_used_by_authentication(
+    token_cache, token_server: LocalServer, responses: RequestsMock, sleeps, monkeypatch
+):
+    monkeypatch.setattr(
+        requests_auth.OAuth2, "retry_policy", requests_auth.RetryPolicy()
+    )
+    token_server.token_responses = [(503, {}, {}, 0), (200, {}, TOKEN, 0)]
+    auth = requests_auth.OAuth2ClientCredentials(
+        f"{token_server.url}/token", client_id="test_user", client_secret="test_pwd"
+    )
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Bearer 2YotnFZFEjr1zCsicMWpAA"
+    )
+    assert len(token_server.token_requests) == 2
+
+
+def test_invalid_max_attempts():
+    with pytest.raises(Exception) as exception_info:
+        requests_auth.RetryPolicy(max_attempts=0)
+    assert str(exception_info.value) == "max_attempts must be a positive integer."
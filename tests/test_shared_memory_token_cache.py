@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import requests_auth
+
+pytest.importorskip("fcntl")
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / "tokens.shm")
+
+
+@pytest.fixture
+def token_cache(path):
+    _token_cache = requests_auth.SharedMemoryTokenCache(path)
+    yield _token_cache
+    _token_cache.clear()
+
+
+def request_token_once(path: str, calls_path: str, results):
+    token_cache = requests_auth.SharedMemoryTokenCache(path)
+
+    def request_new_token():
+        with open(calls_path, "a") as calls:
+            calls.write(f"{os.getpid()}\n")
+        time.sleep(0.2)
+        return "key1", f"token from {os.getpid()}", 3600
+
+    results.put(token_cache.get_token("key1", request_new_token))
+
+
+def test_tokens_are_shared(token_cache, path):
+    other_cache = requests_auth.SharedMemoryTokenCache(path)
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.add_access_token("key2", "token2", 3600, refresh_token="refresh2")
+    assert other_cache.get_token("key1") == "token1"
+    assert other_cache.get_token("key2") == "token2"
+
+    token_cache.add_access_token("key1", "token3", 3600)
+    assert other_cache.get_token("key1") == "token3"
+    assert other_cache.pop_refresh_token("key2") == "refresh2"
+    assert token_cache.pop_refresh_token("key2") is None
+
+
+def test_token_is_requested_by_a_single_process(path, tmp_path):
+    calls_path = str(tmp_path / "calls")
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [
+        context.Process(target=request_token_once, args=(path, calls_path, results))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    tokens = [results.get(timeout=10) for _ in processes]
+    for process in processes:
+        process.join()
+
+    with open(calls_path) as calls:
+        callers = calls.read().split()
+    assert len(callers) == 1
+    assert tokens == [f"token from {callers[0]}"] * 4
+
+
+def test_token_expiring_first_is_replaced_once_full(path):
+    token_cache = requests_auth.SharedMemoryTokenCache(path, slots=2)
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.add_access_token("key2", "token2", 60)
+    token_cache.add_access_token("key3", "token3", 3600)
+
+    other_cache = requests_auth.SharedMemoryTokenCache(path, slots=2)
+    assert other_cache.get_token("key1") == "token1"
+    assert other_cache.get_token("key3") == "token3"
+    with pytest.raises(requests_auth.AuthenticationFailed):
+        other_cache.get_token("key2")
+    # Replaced token is still cached in the process that received it
+    assert token_cache.get_token("key2") == "token2"
+
+
+def test_too_large_token_is_only_cached_in_process(path):
+    token_cache = requests_auth.SharedMemoryTokenCache(path, slot_size=100)
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.add_access_token("key1", "a" * 100, 3600)
+    assert token_cache.get_token("key1") == "a" * 100
+
+    other_cache = requests_auth.SharedMemoryTokenCache(path, slot_size=100)
+    with pytest.raises(requests_auth.AuthenticationFailed):
+        other_cache.get_token("key1")
+
+
+def test_cleared_tokens_are_not_shared_anymore(token_cache, path):
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.clear()
+    other_cache = requests_auth.SharedMemoryTokenCache(path)
+    with pytest.raises(requests_auth.AuthenticationFailed):
+        other_cache.get_token("key1")
+
+
+def test_slot_left_partially_written_is_cleared(token_cache, path):
+    token_cache.add_access_token("key1", "token1", 3600)
+    # As if a process was killed while writing every slot
+    for index in range(token_cache.slots):
+        token_cache.memory[index * token_cache.slot_size] |= 1
+    other_cache = requests_auth.SharedMemoryTokenCache(path)
+    with pytest.raises(requests_auth.AuthenticationFailed):
+        other_cache.get_token("key1")
+    token_cache.add_access_token("key2", "token2", 3600)
+    assert other_cache.get_token("key2") == "token2"
+
+
+def test_invalid_slot_size(path):
+    with pytest.raises(Exception) as exception_info:
+        requests_auth.SharedMemoryTokenCache(path, slot_size=88)
+    assert str(exception_info.value) == "slot_size must be greater than 88 bytes."
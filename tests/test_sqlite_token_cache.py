@@ -0,0 +1,112 @@
+import datetime
+import sqlite3
+import time
+
+import pytest
+import jwt
+
+import requests_auth
+
+
+@pytest.fixture
+def database_path(tmp_path) -> str:
+    return str(tmp_path / "tokens.db")
+
+
+@pytest.fixture
+def token_cache(database_path):
+    _token_cache = requests_auth.SqliteTokenCache(database_path)
+    yield _token_cache
+    _token_cache.clear()
+
+
+def stored_keys(database_path: str) -> list:
+    with sqlite3.connect(database_path) as connection:
+        return [row[0] for row in connection.execute("SELECT key FROM tokens")]
+
+
+def test_add_bearer_tokens(token_cache):
+    expiry_in_1_hour = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    token1 = jwt.encode({"exp": expiry_in_1_hour}, "secret").decode("unicode_escape")
+    token_cache.add_bearer_token("key1", token1)
+    token_cache.add_access_token("key2", "token2", 3600)
+
+    assert token_cache.get_token("key1") == token1
+    assert token_cache.get_token("key2") == "token2"
+
+
+def test_save_tokens(token_cache, database_path):
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.add_access_token("key2", "token2", 3600)
+
+    same_cache = requests_auth.SqliteTokenCache(database_path)
+    # Tokens are only loaded once requested
+    assert same_cache.tokens == {}
+    assert same_cache.get_token("key1") == "token1"
+    assert list(same_cache.tokens) == ["key1"]
+
+
+def test_tokens_updated_by_another_cache_are_used(token_cache, database_path):
+    other_cache = requests_auth.SqliteTokenCache(database_path)
+    token_cache.add_access_token("key1", "token1", 3600)
+    assert other_cache.get_token("key1") == "token1"
+    token_cache.add_access_token("key1", "token2", 3600)
+    assert other_cache.get_token("key1") == "token2"
+    token_cache.invalidate_token("key1", "token2")
+    with pytest.raises(requests_auth.AuthenticationFailed):
+        other_cache.get_token("key1")
+
+
+def test_expired_tokens_are_purged(token_cache, database_path):
+    token_cache.add_access_token("key1", "token1", -1)
+    token_cache.add_access_token("key2", "token2", -1, refresh_token="refresh2")
+    token_cache.add_access_token("key3", "token3", 3600)
+    assert stored_keys(database_path) == ["key2", "key3"]
+    assert list(token_cache.tokens) == ["key2", "key3"]
+
+
+def test_tokens_are_updated_in_place(token_cache):
+    tokens = token_cache.tokens
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.add_access_token("key2", "token2", 3600)
+    token_cache.invalidate_token("key1", "token1")
+    assert token_cache.tokens is tokens
+    assert list(tokens) == ["key2"]
+
+
+def test_expired_tokens_are_purged_after_grace_period(database_path):
+    token_cache = requests_auth.SqliteTokenCache(
+        database_path, stale_token_grace_period=60
+    )
+    token_cache.add_access_token("key1", "token1", -1)
+    token_cache.add_access_token("key2", "token2", -61)
+    assert stored_keys(database_path) == ["key1"]
+    token_cache.connection.execute(
+        "UPDATE tokens SET expiry = ? WHERE key = 'key1'", (time.time() - 61,)
+    )
+    assert token_cache.purge_expired_tokens() == 1
+    assert stored_keys(database_path) == []
+
+
+def test_save_refresh_tokens(token_cache, database_path):
+    token_cache.add_access_token("key1", "token1", -1, refresh_token="refresh1")
+
+    same_cache = requests_auth.SqliteTokenCache(database_path)
+    assert same_cache.pop_refresh_token("key1") == "refresh1"
+    assert same_cache.pop_refresh_token("key1") is None
+
+
+def test_missing_token_function(token_cache):
+    assert token_cache.get_token("key1", lambda: ("key1", "token1", 3600)) == "token1"
+    assert token_cache.get_token("key1") == "token1"
+
+
+def test_wal_journal_mode_by_default(token_cache):
+    assert token_cache.connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+def test_journal_mode_can_be_changed(database_path):
+    token_cache = requests_auth.SqliteTokenCache(database_path, journal_mode="delete")
+    assert token_cache.connection.execute("PRAGMA journal_mode").fetchone() == (
+        "delete",
+    )
@@ -0,0 +1,518 @@
+import datetime
+import threading
+import time
+
+import jwt
+import pytest
+
+from requests_auth.oauth2_tokens import TokenMemoryCache
+
+
+def create_token(expiry: datetime.datetime) -> str:
+    return jwt.encode({"exp": expiry}, "secret").decode("unicode_escape")
+
+
+def test_concurrent_missing_token_function_is_called_once_per_key():
+    token_cache = TokenMemoryCache()
+    token = create_token(datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+    calls = []
+
+    def request_new_token():
+        calls.append(threading.current_thread())
+        time.sleep(0.1)
+        return "key1", token
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                token_cache.get_token("key1", request_new_token)
+            )
+        )
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [token] * 10
+
+
+def test_missing_token_function_is_called_in_parallel_for_different_keys():
+    token_cache = TokenMemoryCache()
+    token = create_token(datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+    # Each call waits for the other one, this would time out if calls were serialized
+    both_calls_in_progress = threading.Barrier(2, timeout=5)
+
+    def request_new_token(key: str):
+        both_calls_in_progress.wait()
+        return key, token
+
+    results = {}
+
+    def get_token(key: str):
+        results[key] = token_cache.get_token(key, request_new_token, key)
+
+    threads = [
+        threading.Thread(target=get_token, args=("key1",)),
+        threading.Thread(target=get_token, args=("key2",)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"key1": token, "key2": token}
+
+
+def test_valid_token_is_retrieved_without_locking_the_cache():
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token1", 3600)
+    # Lock is not reentrant, this would hang if retrieval was locking the cache
+    with token_cache.forbid_concurrent_cache_access:
+        assert token_cache.get_token("key1") == "token1"
+
+
+def test_tokens_are_not_modified_in_place():
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token1", 3600)
+    previous_tokens = token_cache.tokens
+    token_cache.add_access_token("key2", "token2", 3600)
+    assert list(previous_tokens) == ["key1"]
+    assert list(token_cache.tokens) == ["key1", "key2"]
+
+
+def test_expired_token_is_removed_from_cache():
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token1", -1)
+    previous_tokens = token_cache.tokens
+    assert token_cache.get_token("key1", lambda: ("key1", "token2", 3600)) == "token2"
+    assert previous_tokens["key1"][0] == "token1"
+    assert token_cache.tokens["key1"][0] == "token2"
+
+
+def test_token_is_refreshed_in_background_before_expiry():
+    token_cache = TokenMemoryCache(early_refresh_ratio=0.9)
+    tokens = iter(["token1", "token2"])
+    refreshed = threading.Event()
+
+    def request_new_token():
+        token = next(tokens)
+        if token == "token2":
+            refreshed.set()
+        return "key1", token, 1
+
+    assert (
+        token_cache.get_token("key1", request_new_token, background_refresh=True)
+        == "token1"
+    )
+    assert refreshed.wait(timeout=1)
+    assert token_cache.get_token("key1") == "token2"
+    token_cache.clear()
+
+
+def test_token_is_not_refreshed_in_background_if_not_allowed():
+    token_cache = TokenMemoryCache(early_refresh_ratio=0.9)
+    calls = []
+
+    def request_new_token():
+        calls.append(1)
+        return "key1", "token1", 1
+
+    assert token_cache.get_token("key1", request_new_token) == "token1"
+    time.sleep(0.3)
+    assert len(calls) == 1
+
+
+def test_token_is_not_refreshed_in_background_by_default():
+    token_cache = TokenMemoryCache()
+    calls = []
+
+    def request_new_token():
+        calls.append(1)
+        return "key1", "token1", 1
+
+    assert (
+        token_cache.get_token("key1", request_new_token, background_refresh=True)
+        == "token1"
+    )
+    time.sleep(0.3)
+    assert len(calls) == 1
+
+
+def test_background_refresh_is_cancelled_on_clear():
+    token_cache = TokenMemoryCache(early_refresh_ratio=0.5)
+    calls = []
+
+    def request_new_token():
+        calls.append(1)
+        return "key1", "token1", 0.4
+
+    token_cache.get_token("key1", request_new_token, background_refresh=True)
+    token_cache.clear()
+    time.sleep(0.4)
+    assert len(calls) == 1
+
+
+def test_background_refresh_failure_keeps_current_token():
+    token_cache = TokenMemoryCache(early_refresh_ratio=0.9)
+    failed = threading.Event()
+
+    def request_new_token():
+        if token_cache.tokens:
+            failed.set()
+            raise Exception("Token endpoint is down")
+        return "key1", "token1", 10
+
+    token_cache.get_token("key1", request_new_token, background_refresh=True)
+    assert failed.wait(timeout=2)
+    assert token_cache.get_token("key1") == "token1"
+    token_cache.clear()
+
+
+def test_background_refresh_is_retried_after_failure():
+    token_cache = TokenMemoryCache(early_refresh_ratio=0.9)
+    token_cache.refresh_retry_delay = 0.1
+    tokens = iter(["token1", None, None, "token2"])
+    refreshed = threading.Event()
+
+    def request_new_token():
+        token = next(tokens)
+        if not token:
+            raise Exception("Token endpoint is down")
+        if token == "token2":
+            refreshed.set()
+        return "key1", token, 2
+
+    token_cache.get_token("key1", request_new_token, background_refresh=True)
+    assert refreshed.wait(timeout=2)
+    assert token_cache.get_token("key1") == "token2"
+    assert token_cache.background_refresh_failures == 2
+    token_cache.clear()
+
+
+def test_background_refresh_is_not_retried_after_expiry():
+    token_cache = TokenMemoryCache(early_refresh_ratio=0.9)
+    token_cache.refresh_retry_delay = 0.5
+    calls = []
+
+    def request_new_token():
+        calls.append(1)
+        if len(calls) > 1:
+            raise Exception("Token endpoint is down")
+        return "key1", "token1", 0.5
+
+    token_cache.get_token("key1", request_new_token, background_refresh=True)
+    time.sleep(0.8)
+    assert len(calls) == 2
+    assert token_cache.background_refresh_failures == 1
+
+
+def test_scheduler_thread_stops_once_nothing_is_scheduled():
+    token_cache = TokenMemoryCache(early_refresh_ratio=0.5)
+    token_cache.get_token(
+        "key1", lambda: ("key1", "token1", 3600), background_refresh=True
+    )
+    token_cache.get_token(
+        "key2", lambda: ("key2", "token2", 3600), background_refresh=True
+    )
+    thread = token_cache.scheduler.thread
+    assert thread.is_alive()
+    token_cache.clear()
+    thread.join(timeout=1)
+    assert not thread.is_alive()
+    # Thread is started again once needed
+    token_cache.get_token(
+        "key2", lambda: ("key2", "token2", 0.2), background_refresh=True
+    )
+    assert token_cache.scheduler.thread.is_alive()
+    time.sleep(0.3)
+    assert token_cache.get_token("key2") == "token2"
+    token_cache.clear()
+
+
+def test_invalid_early_refresh_ratio():
+    with pytest.raises(Exception) as exception_info:
+        TokenMemoryCache(early_refresh_ratio=1)
+    assert (
+        str(exception_info.value)
+        == "early_refresh_ratio must be between 0 and 1 (excluded)."
+    )
+
+
+def test_expired_token_is_used_within_grace_period_while_refreshing():
+    token_cache = TokenMemoryCache(stale_token_grace_period=60)
+    token_cache.add_access_token("key1", "token1", -1)
+    refresh_requested = threading.Event()
+    refresh_allowed = threading.Event()
+
+    def request_new_token():
+        refresh_requested.set()
+        refresh_allowed.wait(timeout=5)
+        return "key1", "token2", 3600
+
+    for _ in range(3):
+        assert (
+            token_cache.get_token("key1", request_new_token, background_refresh=True)
+            == "token1"
+        )
+    assert refresh_requested.wait(timeout=1)
+    assert token_cache.stale_tokens_served == 3
+    refresh_allowed.set()
+    for _ in range(100):
+        if token_cache.tokens["key1"][0] == "token2":
+            break
+        time.sleep(0.01)
+    assert token_cache.get_token("key1") == "token2"
+    assert token_cache.background_refresh_failures == 0
+
+
+def test_expired_token_is_not_used_after_grace_period():
+    token_cache = TokenMemoryCache(stale_token_grace_period=60)
+    token_cache.add_access_token("key1", "token1", -61)
+    assert (
+        token_cache.get_token(
+            "key1", lambda: ("key1", "token2", 3600), background_refresh=True
+        )
+        == "token2"
+    )
+    assert token_cache.stale_tokens_served == 0
+
+
+def test_expired_token_is_not_used_if_background_refresh_is_not_allowed():
+    token_cache = TokenMemoryCache(stale_token_grace_period=60)
+    token_cache.add_access_token("key1", "token1", -1)
+    assert token_cache.get_token("key1", lambda: ("key1", "token2", 3600)) == "token2"
+    assert token_cache.stale_tokens_served == 0
+
+
+def test_failed_refresh_of_expired_token_is_counted():
+    token_cache = TokenMemoryCache(stale_token_grace_period=60)
+    token_cache.add_access_token("key1", "token1", -1)
+
+    def request_new_token():
+        raise Exception("Token endpoint is down")
+
+    assert (
+        token_cache.get_token("key1", request_new_token, background_refresh=True)
+        == "token1"
+    )
+    for _ in range(100):
+        if token_cache.background_refresh_failures:
+            break
+        time.sleep(0.01)
+    assert token_cache.background_refresh_failures == 1
+    # Another refresh is requested on next usage
+    assert (
+        token_cache.get_token("key1", request_new_token, background_refresh=True)
+        == "token1"
+    )
+    assert token_cache.stale_tokens_served == 2
+
+
+def test_invalidated_token_is_removed():
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token1", 3600)
+    assert token_cache.invalidate_token("key1", "token1")
+    assert "key1" not in token_cache.tokens
+
+
+def test_replaced_token_is_not_invalidated():
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token2", 3600)
+    assert not token_cache.invalidate_token("key1", "token1")
+    assert token_cache.get_token("key1") == "token2"
+
+
+def test_refresh_token_is_kept_when_token_is_invalidated():
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token1", 3600, "refresh1")
+    assert token_cache.invalidate_token("key1", "token1")
+    assert token_cache.get_token("key1", lambda: ("key1", "token2", 3600)) == "token2"
+    token_cache.add_access_token("key2", "token1", 3600, "refresh2")
+    token_cache.invalidate_token("key2", "token1")
+    assert token_cache.pop_refresh_token("key2") == "refresh2"
+
+
+def test_refresh_token_is_kept_when_retrieved():
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token1", -1, "refresh1")
+    assert token_cache.get_refresh_token("key1") == "refresh1"
+    assert token_cache.get_refresh_token("key1") == "refresh1"
+    assert token_cache.get_refresh_token("key2") is None
+
+
+def test_least_recently_used_token_is_evicted_once_full():
+    token_cache = TokenMemoryCache(max_size=2)
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.add_access_token("key2", "token2", 3600)
+    assert token_cache.get_token("key1") == "token1"
+    token_cache.add_access_token("key3", "token3", 3600)
+    assert list(token_cache.tokens) == ["key1", "key3"]
+    assert token_cache.size == 2
+    assert token_cache.evictions == 1
+
+
+def test_background_refresh_is_cancelled_on_eviction():
+    token_cache = TokenMemoryCache(max_size=1, early_refresh_ratio=0.5)
+    calls = []
+
+    def request_new_token():
+        calls.append(1)
+        return "key1", "token1", 0.4
+
+    token_cache.get_token("key1", request_new_token, background_refresh=True)
+    token_cache.add_access_token("key2", "token2", 3600)
+    time.sleep(0.4)
+    assert len(calls) == 1
+    assert list(token_cache.tokens) == ["key2"]
+    assert token_cache.evictions == 1
+    token_cache.clear()
+
+
+def test_updated_token_is_not_evicted():
+    token_cache = TokenMemoryCache(max_size=2)
+    token_cache.add_access_token("key1", "token1", 3600)
+    token_cache.add_access_token("key2", "token2", 3600)
+    token_cache.add_access_token("key1", "token3", 3600)
+    assert token_cache.size == 2
+    assert token_cache.evictions == 0
+
+
+def test_token_loaded_but_never_used_is_evicted_first():
+    token_cache = TokenMemoryCache(max_size=2)
+    token_cache.add_access_token("key1", "token1", 3600)
+    # As loaded from a file saved by another process
+    token_cache.tokens = {**token_cache.tokens, "key2": ("token2", time.time() + 3600)}
+    token_cache.add_access_token("key3", "token3", 3600)
+    assert list(token_cache.tokens) == ["key1", "key3"]
+    token_cache.add_access_token("key4", "token4", 3600)
+    assert list(token_cache.tokens) == ["key3", "key4"]
+    assert token_cache.evictions == 2
+
+
+def test_token_request_lock_is_kept_while_waited_for():
+    token_cache = TokenMemoryCache(max_size=1)
+    calls = []
+    waiting = threading.Thread(
+        target=token_cache.get_token,
+        args=("key1", lambda: calls.append(1) or ("key1", "token1", 3600)),
+    )
+    with token_cache._missing_token_lock("key1"):
+        waiting.start()
+        while token_cache.missing_token_locks["key1"][1] < 2:
+            time.sleep(0.01)
+        # Removing the token must not remove the lock another thread is about to acquire
+        token_cache.add_access_token("key1", "token0", 3600)
+        token_cache.add_access_token("key2", "token2", 3600)
+        assert "key1" in token_cache.missing_token_locks
+    waiting.join()
+    assert calls == [1]
+    assert token_cache.missing_token_locks == {}
+
+
+def test_invalid_max_size():
+    with pytest.raises(Exception) as exception_info:
+        TokenMemoryCache(max_size=0)
+    assert str(exception_info.value) == "max_size must be a positive integer."
+
+
+def test_expired_token_is_evicted_without_retrieval():
+    token_cache = TokenMemoryCache(evict_expired_tokens=True)
+    token_cache.add_access_token("key1", "token1", 0.1)
+    token_cache.add_access_token("key2", "token2", 3600)
+    token_cache.add_access_token("key3", "token3", 0.1, "refresh3")
+    for _ in range(100):
+        if token_cache.expired_evictions:
+            break
+        time.sleep(0.01)
+    assert token_cache.expired_evictions == 1
+    assert list(token_cache.tokens) == ["key2", "key3"]
+    token_cache.clear()
+
+
+def test_expired_token_is_evicted_after_grace_period():
+    token_cache = TokenMemoryCache(
+        evict_expired_tokens=True, stale_token_grace_period=0.2
+    )
+    token_cache.add_access_token("key1", "token1", 0)
+    time.sleep(0.1)
+    assert token_cache.size == 1
+    for _ in range(100):
+        if token_cache.expired_evictions:
+            break
+        time.sleep(0.01)
+    assert token_cache.size == 0
+    token_cache.clear()
+
+
+def test_renewed_token_is_not_evicted_at_previous_expiry():
+    token_cache = TokenMemoryCache(evict_expired_tokens=True)
+    token_cache.add_access_token("key1", "token1", 0.1)
+    token_cache.add_access_token("key1", "token2", 3600)
+    time.sleep(0.2)
+    assert token_cache.get_token("key1") == "token2"
+    assert token_cache.expired_evictions == 0
+    token_cache.clear()
+
+
+def test_token_is_expired_within_expiry_margin():
+    token_cache = TokenMemoryCache(expiry_margin=30)
+    token_cache.add_access_token("key1", "token1", 20)
+    token_cache.add_access_token("key2", "token2", 60)
+    assert token_cache.get_token("key1", lambda: ("key1", "token3", 60)) == "token3"
+    assert token_cache.get_token("key2") == "token2"
+
+
+def test_invalid_expiry_margin():
+    with pytest.raises(Exception) as exception_info:
+        TokenMemoryCache(expiry_margin=-1)
+    assert str(exception_info.value) == "expiry_margin cannot be negative."
+
+
+def test_token_expiry_is_not_extended_by_system_clock_set_back(monkeypatch):
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token1", -1)
+    system_time = time.time()
+    monkeypatch.setattr(time, "time", lambda: system_time - 7200)
+    assert token_cache.get_token("key1", lambda: ("key1", "token2", 3600)) == "token2"
+
+
+def test_token_is_expired_once_system_clock_passed_expiry(monkeypatch):
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token1", 3600)
+    # As after a system suspend (monotonic clock not advancing meanwhile)
+    system_time = time.time()
+    monkeypatch.setattr(time, "time", lambda: system_time + 7200)
+    assert token_cache.get_token("key1", lambda: ("key1", "token2", 3600)) == "token2"
+
+
+def test_token_is_not_expired_once_system_clock_set_back_on_time(monkeypatch):
+    system_time = time.time()
+    # As a process started with system clock ahead, corrected afterwards
+    monkeypatch.setattr(time, "time", lambda: system_time + 3600)
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "token1", 1800)
+    monkeypatch.setattr(time, "time", lambda: system_time)
+    token_cache.add_access_token("key2", "token2", 1800)
+    new_tokens = []
+    new_token = lambda key: new_tokens.append(key) or (key, "new_token", 1800)
+    assert token_cache.get_token("key1", new_token, "key1") == "token1"
+    assert token_cache.get_token("key2", new_token, "key2") == "token2"
+    assert token_cache.get_token("key2", new_token, "key2") == "token2"
+    assert new_tokens == []
+
+
+def test_tokens_are_not_logged(caplog):
+    caplog.set_level("DEBUG")
+    token_cache = TokenMemoryCache()
+    token_cache.add_access_token("key1", "secret_token1", 3600, "secret_refresh1")
+    assert token_cache.get_token("key1") == "secret_token1"
+    assert (
+        token_cache.get_token("key2", lambda: ("key2", "secret_token2", 3600))
+        == "secret_token2"
+    )
+    assert 'with "key1" key' in caplog.text
+    assert "secret" not in caplog.text
@@ -0,0 +1,77 @@
+from responses import RequestsMock
+import requests
+
+import requests_auth
+from tests.oauth2_helper import token_cache
+from tests.auth_helper import get_header, get_request
+
+
+def test_token_is_requested_with_provided_session(token_cache, responses: RequestsMock):
+    session = requests.Session()
+    session.headers["X-Session"] = "custom"
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token",
+        client_id="test_user",
+        client_secret="test_pwd",
+        session=session,
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+    )
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Bearer 2YotnFZFEjr1zCsicMWpAA"
+    )
+    token_request = get_request(responses, "http://provide_access_token/")
+    assert token_request.headers["X-Session"] == "custom"
+    # Session is not part of the token request
+    assert token_request.body == "grant_type=client_credentials"
+
+
+def test_token_is_requested_with_shared_session_by_default(
+    token_cache, responses: RequestsMock, monkeypatch
+):
+    session = requests_auth.create_token_session()
+    session.headers["X-Session"] = "shared"
+    monkeypatch.setattr(requests_auth.OAuth2, "session", session)
+    auth = requests_auth.OAuth2ResourceOwnerPasswordCredentials(
+        "http://provide_access_token", username="test_user", password="test_pwd"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+    )
+    assert (
+        get_header(responses, auth).get("Authorization")
+        == "Bearer 2YotnFZFEjr1zCsicMWpAA"
+    )
+    token_request = get_request(responses, "http://provide_access_token/")
+    assert token_request.headers["X-Session"] == "shared"
+
+
+def test_token_session_does_not_store_cookies(token_cache, responses: RequestsMock):
+    auth = requests_auth.OAuth2ClientCredentials(
+        "http://provide_access_token", client_id="test_user", client_secret="test_pwd"
+    )
+    responses.add(
+        responses.POST,
+        "http://provide_access_token",
+        json={"access_token": "2YotnFZFEjr1zCsicMWpAA", "expires_in": 3600},
+        headers={"Set-Cookie": "session_id=123456"},
+    )
+    get_header(responses, auth)
+    assert not requests_auth.OAuth2.session.cookies
+
+
+def test_token_session_connection_pool():
+    session = requests_auth.create_token_session(
+        pool_connections=2, pool_maxsize=20, pool_block=True
+    )
+    adapter = session.get_adapter("https://provide_access_token")
+    assert adapter is session.get_adapter("http://provide_access_token")
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 20
+    assert adapter.poolmanager.connection_pool_kw["block"]
+    assert adapter.poolmanager.pools._maxsize == 2